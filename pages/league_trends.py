@@ -0,0 +1,114 @@
+import streamlit as st
+import altair as alt
+from utils.config import get_season_urls
+from utils.dataset import get_dataset
+from utils.layout import set_page_config, inject_css, show_header, render_perf_panel
+from utils.trends import league_trends
+from utils.tracing import start_trace, finish_trace, span
+from utils.metrics import RERUN_DURATION, cached_call, start_exporter
+
+start_trace("league_trends")
+start_exporter()
+set_page_config()
+inject_css()
+
+SEASON_URLS = get_season_urls()
+
+with st.spinner("Loading data..."):
+    dataset = get_dataset(SEASON_URLS)
+for season in dataset.failed_seasons:
+    st.warning(f"Couldn't load {season} from Google Sheets right now, refresh to try again.")
+
+show_header("League Trends")
+
+# Only the aggregated points below are sent to the browser
+with span("trends.aggregate"):
+    trends = cached_call("league_trends", league_trends, dataset.version, dataset)
+seasons = dataset.seasons
+stats = trends["leg_stats"]
+league = trends["league"]
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Legs played", f"{trends['legs']:,}")
+col2.metric("Goals per leg", f"{league['GoalsPerLeg'].mul(league['Legs']).sum() / max(1, league['Legs'].sum()):.2f}")
+col3.metric("Draw rate", f"{league['DrawRate'].mul(league['Legs']).sum() / max(1, league['Legs'].sum()):.0%}")
+col4.metric("Home share of goals", f"{trends['home_goal_share']:.0%}")
+
+x_season = alt.X("Season:N", sort=seasons, title="Season", axis=alt.Axis(labelAngle=0))
+division_color = alt.Color("Division:N", scale=alt.Scale(scheme="category10"))
+
+with span("trends.charts"):
+    st.markdown("#### Goals per leg")
+    st.altair_chart(
+        alt.Chart(stats).mark_line(point=True).encode(
+            x=x_season,
+            y=alt.Y("GoalsPerLeg:Q", title="Goals per leg"),
+            color=division_color,
+            tooltip=["Season:N", "Division:N", alt.Tooltip("GoalsPerLeg:Q", format=".2f"), "Legs:Q"],
+        ),
+        use_container_width=True,
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Home advantage")
+        st.caption("Home side as listed in the fixture sheet")
+        home_away = league.melt(
+            id_vars=["Season"], value_vars=["HomeWinRate", "DrawRate", "AwayWinRate"],
+            var_name="Result", value_name="Rate",
+        )
+        home_away["Result"] = home_away["Result"].map(
+            {"HomeWinRate": "Home win", "DrawRate": "Draw", "AwayWinRate": "Away win"})
+        st.altair_chart(
+            alt.Chart(home_away).mark_bar().encode(
+                x=x_season,
+                y=alt.Y("Rate:Q", stack="normalize", axis=alt.Axis(format="%"), title=None),
+                color=alt.Color("Result:N", sort=["Home win", "Draw", "Away win"],
+                                scale=alt.Scale(range=["#28a745", "#ffc107", "#dc3545"])),
+                tooltip=["Season:N", "Result:N", alt.Tooltip("Rate:Q", format=".0%")],
+            ),
+            use_container_width=True,
+        )
+    with col2:
+        st.markdown("#### Draw rate")
+        st.altair_chart(
+            alt.Chart(stats).mark_line(point=True).encode(
+                x=x_season,
+                y=alt.Y("DrawRate:Q", axis=alt.Axis(format="%"), title=None),
+                color=division_color,
+                tooltip=["Season:N", "Division:N", alt.Tooltip("DrawRate:Q", format=".0%"), "Legs:Q"],
+            ),
+            use_container_width=True,
+        )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Participation")
+        st.altair_chart(
+            alt.Chart(trends["participation"]).mark_bar().encode(
+                x=x_season,
+                y=alt.Y("Players:Q", title="Players"),
+                color=division_color,
+                tooltip=["Season:N", "Division:N", "Players:Q"],
+            ),
+            use_container_width=True,
+        )
+    with col2:
+        st.markdown("#### Promotion / relegation flows")
+        flows = trends["flows"]
+        if flows.empty:
+            st.info("Flows need at least two seasons.")
+        else:
+            st.altair_chart(
+                alt.Chart(flows).mark_bar().encode(
+                    x=alt.X("Season:N", sort=seasons[1:], title="Into season", axis=alt.Axis(labelAngle=0)),
+                    y=alt.Y("Players:Q", title="Players"),
+                    color=alt.Color("Move:N", scale=alt.Scale(scheme="tableau20")),
+                    tooltip=["Season:N", "From:N", "To:N", "Players:Q"],
+                ),
+                use_container_width=True,
+            )
+
+trace = finish_trace()
+RERUN_DURATION.observe(trace.wall_ms / 1000, page="league_trends")
+render_perf_panel(trace)
@@ -1,11 +1,20 @@
 import streamlit as st
-from utils.players import all_players, player_codes, link_url
-from utils.seeds import get_shuffled_seeds
-from utils.sheet import load_assignments, append_assignment
+import time
+from utils.players import get_all_players, get_player_codes, get_link_url
+from utils.bracket import DEFAULT_TITLE, get_bracket
+from utils.sheet import SeedConflictError, SHEETS_BUSY_MESSAGE
+from utils.draw_state import get_draw_state
+from utils.config import get_setting
+from utils.sheets_io import SheetsUnavailableError
+from utils.metrics import RERUN_DURATION, start_exporter
 from datetime import datetime
+from streamlit.errors import StreamlitAPIException
+
+rerun_start = time.perf_counter()
+start_exporter()
 
 # Import layout for consistent styling
-from utils.layout import inject_css
+from utils.layout import inject_css, traced_fragment
 inject_css()
 
 # Override main app background for this page
@@ -19,25 +28,29 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- 1. Player and Code Setup ---
-if "shuffled_seeds" not in st.session_state:
-    st.session_state.shuffled_seeds = get_shuffled_seeds()
+all_players = get_all_players()
+player_codes = get_player_codes()
+link_url = get_link_url()
+bracket = get_bracket(all_players)
+PAGE_SIZE = int(get_setting("draw", "page_size", 64))
 
-# --- 2. Load from Google Sheet ---
-assignments, error = load_assignments()
-if error:
+# --- 2. Load the shared draw state (kept in sync with the Google Sheet) ---
+draw = get_draw_state()
+_, assignments, error = draw.current()
+if assignments is None:
     st.error(error)
     st.stop()
 
-taken_seeds = set(assignments.values())
-available_players = [p for p in all_players if p not in assignments]
 
 # --- 3. Title ---
-st.title("🏆 S8 Knockout Cup Draws")
+st.title(f"🏆 {get_setting('draw', 'title', DEFAULT_TITLE)}")
 
 # --- 4. Authentication (Always shown first) ---
 st.subheader("🔐 Enter to Choose Your Tile")
 
-selected_player = st.selectbox("👤 Select your name:", [""] + available_players)
+# Options stay fixed while the draw runs: if they changed with every claim, Streamlit
+# would reset everyone's selection. Seeded players are shown their seed on submit.
+selected_player = st.selectbox("👤 Select your name:", [""] + list(all_players))
 access_code = st.text_input("🔑 Enter your access code:", type="password")
 
 if st.button("✅ Submit"):
@@ -51,6 +64,52 @@ if st.button("✅ Submit"):
         st.session_state.verified_player = selected_player
         st.rerun()
 
+# --- Seed grid: redrawn from the shared draw state, so new claims show up without a full rerun ---
+@traced_fragment("seed_reveal", "grid", run_every=float(get_setting("draw", "grid_refresh", 2)))
+def seed_grid(player):
+    _, assignments, _ = draw.current()
+    if player in assignments:
+        # Claimed (here or in another tab); show the confirmation
+        st.rerun()
+    # A lost race from the previous run, shown once on the refreshed grid
+    conflict = st.session_state.pop("seed_conflict", None)
+    if conflict:
+        st.warning(conflict)
+    taken_seeds = set(assignments.values())
+    tiles = bracket.tiles_for(player)
+    # Large draws are shown a page of tiles at a time so each redraw stays small
+    if len(tiles) > PAGE_SIZE:
+        pages = range(0, len(tiles), PAGE_SIZE)
+        start = st.radio(
+            "Tiles", pages, horizontal=True, key="tile_page",
+            format_func=lambda i: f"{i + 1}–{min(i + PAGE_SIZE, len(tiles))}",
+        )
+        tiles = tiles[start:start + PAGE_SIZE]
+    cols = st.columns(8)
+
+    for idx, seed in enumerate(tiles):
+        col = cols[idx % 8]
+        with col:
+            if seed in taken_seeds:
+                st.button(seed, key=f"select_disabled_{seed}", disabled=True)
+            else:
+                if st.button("🔒", key=f"{player}_{seed}"):
+                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    try:
+                        draw.claim(player, seed, timestamp)
+                    except SeedConflictError as e:
+                        st.session_state.seed_conflict = str(e)
+                        try:
+                            st.rerun(scope="fragment")
+                        except StreamlitAPIException:
+                            # The click was handled in a full run, not a fragment rerun
+                            st.rerun()
+                    except SheetsUnavailableError:
+                        st.error(SHEETS_BUSY_MESSAGE)
+                        return
+                    st.success(f"🎯 You have been seeded to **{seed}**!")
+                    st.rerun()
+
 # --- 5. Show seed selection only after authentication ---
 if "verified_player" in st.session_state:
     player = st.session_state.verified_player
@@ -62,16 +121,23 @@ if "verified_player" in st.session_state:
         
         # --- Seed Selection ---
         st.subheader("Pick Your Seed")
-        cols = st.columns(8)
-
-        for idx, seed in enumerate(st.session_state.shuffled_seeds):
-            col = cols[idx % 8]
-            with col:
-                if seed in taken_seeds:
-                    st.button(seed, key=f"select_disabled_{seed}", disabled=True)
-                else:
-                    if st.button("🔒", key=f"{player}_{seed}"):
-                        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        append_assignment(player, seed, timestamp)
-                        st.success(f"🎯 You have been seeded to **{seed}**!")
-                        st.rerun()
+        seed_grid(player)
+
+# --- 6. Bracket ---
+with st.expander("📋 Bracket"):
+    rounds = bracket.fixture_tree(assignments)
+    names = [name for name, _ in rounds]
+    round_choice = st.selectbox("Round", names, key="bracket_round")
+    matches = dict(rounds)[round_choice]
+    st.dataframe(
+        [{"Match": match, "Home": home, "Away": away} for match, home, away in matches],
+        hide_index=True, width="stretch",
+    )
+    # The seed gives away every hidden tile, so it is only revealed once the draw is over
+    if bracket.is_complete(assignments):
+        st.caption(f"Draw seed: {bracket.draw_seed} · nonce: {bracket.nonce} · "
+                   f"commitment (SHA-256 of nonce:seed): {bracket.commitment}")
+    else:
+        st.caption(f"Draw commitment: {bracket.commitment}. The seed is revealed when every slot is drawn.")
+
+RERUN_DURATION.observe(time.perf_counter() - rerun_start, page="seed_reveal")
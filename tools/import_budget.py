@@ -0,0 +1,154 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Cold-start import budget for the app's entry scripts. Each script's
+# module-level imports are run in a fresh interpreter under `-X importtime`,
+# after streamlit itself (the server has loaded that before any script runs),
+# and the time they add is checked against the script's budget. Heavy
+# dependencies that belong to one feature (altair for charts, gspread and
+# google-auth for Sheets, requests for roasts) must not be imported at startup
+# by scripts that list them as forbidden. Run after changing imports:
+#
+#   python -m tools.import_budget
+#
+# Exits 1 if any script is over budget or imports a forbidden module.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SHEETS = ["gspread", "google.auth", "google.oauth2"]
+BUDGETS = {
+    # The welcome/roast screen needs pandas for the dataset, but no chart, Sheets client or HTTP
+    "H2H.py": {"budget_ms": 600, "forbid": ["altair", "requests"] + SHEETS},
+    "pages/league_trends.py": {"budget_ms": 900, "forbid": ["requests"] + SHEETS},
+    "pages/seed_reveal.py": {"budget_ms": 400, "forbid": ["altair", "pandas"]},
+}
+
+MARKER = "--- app imports ---"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check the app's startup imports against a time budget")
+    parser.add_argument("scripts", nargs="*", help=f"entry scripts to check (default: {', '.join(BUDGETS)})")
+    parser.add_argument("--budget-ms", type=float, help="override every script's budget")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per script; the fastest counts")
+    parser.add_argument("--top", type=int, default=8, help="heaviest packages to list per script")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def module_imports(path):
+    """The import statements a script runs at module level, as source lines"""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    lines = []
+
+    def visit(statements):
+        for node in statements:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                lines.append(ast.unparse(node))
+            elif isinstance(node, (ast.If, ast.Try, ast.With)):
+                # Runs at import time too; function and class bodies don't
+                for field in ("body", "orelse", "finalbody"):
+                    visit(getattr(node, field, []))
+                for handler in getattr(node, "handlers", []):
+                    visit(handler.body)
+
+    visit(tree.body)
+    return lines
+
+
+def parse_importtime(stderr):
+    """[(module, depth, self_us, cumulative_us)] for imports after MARKER"""
+    entries = []
+    started = False
+    for line in stderr.splitlines():
+        if line == MARKER:
+            started = True
+            continue
+        if not started or not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # the header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, self_us, cumulative_us))
+    return entries
+
+
+def measure(imports):
+    code = "\n".join(["import streamlit, sys", f"print({MARKER!r}, file=sys.stderr, flush=True)"] + imports)
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return parse_importtime(result.stderr)
+
+
+def forbidden_imports(entries, forbid):
+    """The forbidden packages that any of entries belongs to"""
+    modules = [module for module, *_ in entries]
+    return [name for name in forbid if any(m == name or m.startswith(name + ".") for m in modules)]
+
+
+def check(script, budget_ms, forbid, runs, top):
+    imports = module_imports(os.path.join(ROOT, script))
+    entries = min((measure(imports) for _ in range(max(1, runs))),
+                  key=lambda entries: sum(e[3] for e in entries if e[1] == 0))
+    total_ms = sum(cumulative for _, depth, _, cumulative in entries if depth == 0) / 1000
+    by_package = defaultdict(int)
+    for module, _, self_us, _ in entries:
+        by_package[module.split(".")[0]] += self_us
+    heaviest = sorted(by_package.items(), key=lambda item: -item[1])[:top]
+    forbidden = forbidden_imports(entries, forbid)
+    return {
+        "script": script,
+        "import_ms": round(total_ms, 1),
+        "budget_ms": budget_ms,
+        "over_budget": total_ms > budget_ms,
+        "modules": len(entries),
+        "heaviest_ms": {package: round(us / 1000, 1) for package, us in heaviest},
+        "forbidden_imported": forbidden,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    reports = []
+    for script in args.scripts or list(BUDGETS):
+        script = os.path.relpath(os.path.abspath(script), ROOT) if args.scripts else script
+        config = BUDGETS.get(script.replace(os.sep, "/"), {"budget_ms": 600, "forbid": []})
+        budget_ms = args.budget_ms if args.budget_ms is not None else config["budget_ms"]
+        try:
+            reports.append(check(script, budget_ms, config["forbid"], args.runs, args.top))
+        except RuntimeError as e:
+            reports.append({"script": script, "error": str(e)})
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for report in reports:
+            if "error" in report:
+                print(f"{report['script']}: imports failed: {report['error']}")
+                continue
+            status = "OVER BUDGET" if report["over_budget"] else "ok"
+            print(f"{report['script']}: {report['import_ms']} ms of {report['budget_ms']} ms "
+                  f"({report['modules']} modules) {status}")
+            for package, ms in report["heaviest_ms"].items():
+                print(f"    {package:<24} {ms:>8} ms")
+            if report["forbidden_imported"]:
+                print(f"    imports at startup: {', '.join(report['forbidden_imported'])}")
+    failed = any(r.get("error") or r["over_budget"] or r["forbidden_imported"] for r in reports)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
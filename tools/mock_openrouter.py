@@ -0,0 +1,287 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for OpenRouter's chat completions API and GitHub's gist API,
+# for load-testing and benchmarking the roast path without credits or network.
+#
+#   python -m tools.mock_openrouter --latency-ms 800 --tokens-per-second 40 --error-rate 0.05
+#
+# Then point the app at it in secrets.toml:
+#
+#   [openrouter]
+#   api_key = "mock"
+#   base_url = "http://127.0.0.1:8765/api/v1"
+#
+#   [github]
+#   api_url = "http://127.0.0.1:8765"
+#
+# GET /stats returns request counts and the peak number of concurrent completions.
+
+DEFAULT_PROMPTS = """## System Message
+You are a witty football pundit who roasts FC tournament players. Keep it playful.
+
+## User Template
+Roast this player based on their stats:
+{stats}
+
+## AI Settings
+- model: mock/roaster
+- max_tokens: 120
+- temperature: 0.9
+"""
+
+ROAST_WORDS = (
+    "this player defends like the goalposts are optional and attacks like the ball owes them money. "
+    "Their form guide reads like a ransom note, every season a fresh cry for help, and the only thing "
+    "consistent about them is the excuses. Even the ref felt sorry, and the ref was on a coffee break."
+).split()
+
+
+class MockState:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.prompts = DEFAULT_PROMPTS
+        if args.prompt_file:
+            with open(args.prompt_file, "r", encoding="utf-8") as f:
+                self.prompts = f.read()
+        self.prompts_etag = '"%s"' % hashlib.sha1(self.prompts.encode("utf-8")).hexdigest()
+        self.counts = {"completions": 0, "streams": 0, "errors": 0, "dropped": 0, "gists": 0, "gists_not_modified": 0}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def latency(self):
+        """Seconds before the first token, drawn from the configured distribution"""
+        args = self.args
+        with self.lock:
+            if args.latency_dist == "normal":
+                ms = self.rng.gauss(args.latency_ms, args.latency_jitter_ms)
+            elif args.latency_dist == "lognormal":
+                # latency_ms is the median; latency_sigma sets the tail
+                ms = args.latency_ms * self.rng.lognormvariate(0, args.latency_sigma)
+            elif args.latency_dist == "exponential":
+                ms = self.rng.expovariate(1 / args.latency_ms) if args.latency_ms > 0 else 0
+            else:
+                ms = args.latency_ms
+        return max(0.0, ms) / 1000
+
+    def roll(self, rate):
+        with self.lock:
+            return self.rng.random() < rate
+
+    def error_status(self):
+        with self.lock:
+            return self.rng.choice(self.args.error_status)
+
+    def enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts, in_flight=self.in_flight, peak_in_flight=self.peak_in_flight)
+
+
+def roast_tokens(count):
+    words = [ROAST_WORDS[i % len(ROAST_WORDS)] for i in range(count)]
+    return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so the app's pooled sessions reuse connections as they would upstream
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        if not self.state.args.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path.startswith("/gists/"):
+            self._gist()
+        elif path == "/stats":
+            self._send_json(200, self.state.snapshot())
+        else:
+            self._send_json(404, {"message": "Not Found"})
+
+    def do_POST(self):
+        if self.path.split("?")[0].rstrip("/") == "/api/v1/chat/completions":
+            self._completion()
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "Not Found"}})
+
+    def _gist(self):
+        state = self.state
+        time.sleep(state.args.gist_latency_ms / 1000)
+        if self.headers.get("If-None-Match") == state.prompts_etag:
+            state.count("gists_not_modified")
+            self.send_response(304)
+            self.send_header("ETag", state.prompts_etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        state.count("gists")
+        gist_id = self.path.split("?")[0].rstrip("/").split("/")[-1]
+        self._send_json(
+            200,
+            {"id": gist_id, "files": {"prompts.md": {"filename": "prompts.md", "content": state.prompts}}},
+            headers={"ETag": state.prompts_etag},
+        )
+
+    def _completion(self):
+        state = self.state
+        request = self._read_json()
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            state.count("errors")
+            self._send_json(401, {"error": {"code": 401, "message": "No auth credentials found"}})
+            return
+        state.enter()
+        try:
+            if state.roll(state.args.error_rate):
+                status = state.error_status()
+                state.count("errors")
+                # Upstream errors arrive after part of the usual wait
+                time.sleep(state.latency() / 2)
+                self._send_json(status, {"error": {"code": status, "message": "Mock upstream error"}})
+                return
+            count = min(int(request.get("max_tokens") or state.args.tokens), state.args.tokens)
+            tokens = roast_tokens(count)
+            completion_id = f"gen-mock-{uuid.uuid4().hex[:12]}"
+            model = request.get("model", "mock/roaster")
+            if request.get("stream"):
+                self._stream(tokens, completion_id, model)
+            else:
+                time.sleep(state.latency() + count / state.args.tokens_per_second)
+                state.count("completions")
+                self._send_json(200, {
+                    "id": completion_id,
+                    "model": model,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "".join(tokens)}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": count, "total_tokens": count},
+                })
+        finally:
+            state.leave()
+
+    def _stream(self, tokens, completion_id, model):
+        state = self.state
+        drop_at = len(tokens) // 2 if state.roll(state.args.drop_rate) else None
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            # OpenRouter sends keep-alive comments while the model is queued
+            self._send_chunk(": OPENROUTER PROCESSING\n\n")
+            time.sleep(state.latency())
+            for i, token in enumerate(tokens):
+                if i == drop_at:
+                    # Cut the connection mid-stream without the terminating chunk
+                    state.count("dropped")
+                    self.close_connection = True
+                    return
+                event = {
+                    "id": completion_id,
+                    "model": model,
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                self._send_chunk(f"data: {json.dumps(event)}\n\n")
+                time.sleep(1 / state.args.tokens_per_second)
+            self._send_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            state.count("streams")
+        except (BrokenPipeError, ConnectionResetError):
+            # The app cancelled the roast
+            self.close_connection = True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mock OpenRouter chat completions and GitHub gist API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-dist", choices=["fixed", "normal", "lognormal", "exponential"], default="lognormal",
+                        help="distribution of the wait before the first token")
+    parser.add_argument("--latency-ms", type=float, default=600,
+                        help="fixed value, mean (normal, exponential) or median (lognormal)")
+    parser.add_argument("--latency-jitter-ms", type=float, default=150, help="standard deviation for normal")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="shape for lognormal")
+    parser.add_argument("--tokens-per-second", type=float, default=40)
+    parser.add_argument("--tokens", type=int, default=60, help="tokens per roast, capped by the request's max_tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of completions that fail")
+    parser.add_argument("--error-status", type=int, nargs="+", default=[429, 502],
+                        help="HTTP statuses to fail with, picked at random")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="fraction of streams cut off halfway through")
+    parser.add_argument("--gist-latency-ms", type=float, default=50)
+    parser.add_argument("--prompt-file", help="markdown served as the gist, instead of the built-in prompts")
+    parser.add_argument("--seed", type=int, help="random seed, for repeatable runs")
+    parser.add_argument("--quiet", action="store_true", help="don't log each request")
+    args = parser.parse_args(argv)
+    if args.tokens_per_second <= 0:
+        parser.error("--tokens-per-second must be positive")
+    return args
+
+
+def make_server(args):
+    handler = type("Handler", (MockHandler,), {"state": MockState(args)})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = make_server(args)
+    host, port = server.server_address[:2]
+    print(f"Mock OpenRouter listening on http://{host}:{port}/api/v1 (gists at http://{host}:{port}/gists/<id>)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.RequestHandlerClass.state.snapshot()))
+
+
+if __name__ == "__main__":
+    main()
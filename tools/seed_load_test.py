@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import toml
+
+# Load test for the cup draw: N simulated players log in on the seed-reveal
+# page and click tiles until they are seeded, all at once, against the replay
+# Sheets backend (no network or credentials). Run before a draw:
+#
+#   python -m tools.seed_load_test --players 64 --latency-ms 200 --quota-error-rate 0.05
+#
+# --auth-error-appends N checks that a transient auth outage during the draw
+# delays the claim rows instead of dead-lettering them.
+#
+# --mode app drives pages/seed_reveal.py through Streamlit's AppTest, one
+# script run per interaction like a real browser session. AppTest keeps
+# process-global runtime state, so script runs take turns (background work
+# such as the write queue still overlaps) and latencies are measured inside
+# the run. --mode direct calls the claim path from all players truly at once,
+# without Streamlit, for contention and larger draws.
+
+_app_lock = threading.Lock()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE = os.path.join(ROOT, "pages", "seed_reveal.py")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a full cup draw against the offline Sheets backend")
+    parser.add_argument("--players", type=int, default=32)
+    parser.add_argument("--size", type=int, help="draw size (default: smallest power of two that fits)")
+    parser.add_argument("--mode", choices=["app", "direct"], default="app")
+    parser.add_argument("--concurrency", type=int, help="players acting at once (default: all)")
+    parser.add_argument("--think-ms", type=float, default=300, help="mean pause between a player's actions")
+    parser.add_argument("--latency-ms", type=float, default=150, help="simulated Sheets call latency")
+    parser.add_argument("--latency-jitter-ms", type=float, default=50)
+    parser.add_argument("--quota-error-rate", type=float, default=0.0)
+    parser.add_argument("--auth-error-appends", type=int, default=0,
+                        help="fail the first N appends like a token refresh that can't connect")
+    parser.add_argument("--max-attempts", type=int, default=20, help="tile clicks before a player gives up")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the simulated players and the draw")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary working directory")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+    if args.size is None:
+        args.size = 2
+        while args.size < args.players:
+            args.size *= 2
+    return args
+
+
+def percentiles(values):
+    if not values:
+        return {"n": 0}
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+    return {"n": len(values), "p50_ms": round(pick(50), 1), "p95_ms": round(pick(95), 1),
+            "p99_ms": round(pick(99), 1), "max_ms": round(values[-1], 1)}
+
+
+class Simulation:
+    def __init__(self, args, players):
+        self.args = args
+        self.players = players
+        self.codes = {player: f"code-{i}" for i, player in enumerate(players)}
+        self.lock = threading.Lock()
+        self.claim_ms = []
+        self.attempt_ms = []
+        self.told = {}
+        self.conflicts = 0
+        self.failures = []
+
+    def think(self, rng):
+        if self.args.think_ms:
+            time.sleep(rng.expovariate(1 / self.args.think_ms) / 1000)
+
+    def secrets(self):
+        secrets = {
+            "all_players": {"all_players": self.players},
+            "player_codes": self.codes,
+            "links": {"link_url": "https://example.com/draw"},
+            "draw": {"size": self.args.size, "random_seed": self.args.seed},
+        }
+        if self.args.auth_error_appends:
+            # Keep the write queue's backoff short so the simulated outage doesn't dominate the run
+            secrets["write_queue"] = {"max_backoff": 2}
+        return secrets
+
+    def record(self, player, seed, claim_ms, attempts_ms, conflicts):
+        """claim_ms: time spent in claim attempts (excluding think time) until seeded"""
+        with self.lock:
+            self.told[player] = seed
+            self.claim_ms.append(claim_ms)
+            self.attempt_ms.extend(attempts_ms)
+            self.conflicts += conflicts
+
+    def run_app(self, at):
+        """One script run; returns its duration in ms"""
+        with _app_lock:
+            start = time.perf_counter()
+            at.run()
+            return (time.perf_counter() - start) * 1000
+
+    def run_app_player(self, player):
+        from streamlit.testing.v1 import AppTest
+
+        rng = random.Random(f"{self.args.seed}:{player}")
+        at = AppTest.from_file(PAGE, default_timeout=120)
+        self.run_app(at)
+        self.think(rng)
+        at.selectbox[0].select(player)
+        at.text_input[0].input(self.codes[player])
+        next(b for b in at.button if "Submit" in b.label).click()
+        self.run_app(at)
+        attempts_ms, conflicts = [], 0
+        for _ in range(self.args.max_attempts):
+            tiles = [b for b in at.button if b.label == "🔒" and not b.disabled]
+            if not tiles:
+                break
+            tile = rng.choice(tiles)
+            seed = tile.key.split("_", 1)[1]
+            self.think(rng)
+            tile.click()
+            attempts_ms.append(self.run_app(at))
+            if any(f"seeded to **{seed}**" in s.value for s in at.success):
+                self.record(player, seed, sum(attempts_ms), attempts_ms, conflicts)
+                return
+            if at.exception:
+                self.failures.append(f"{player}: {at.exception[0].value}")
+                return
+            conflicts += 1
+        self.failures.append(f"{player}: not seeded after {len(attempts_ms)} clicks")
+
+    def run_direct_player(self, player):
+        from utils.bracket import get_bracket
+        from utils.draw_state import get_draw_state
+        from utils.sheet import SeedConflictError
+
+        rng = random.Random(f"{self.args.seed}:{player}")
+        draw = get_draw_state()
+        bracket = get_bracket(self.players)
+        attempts_ms, conflicts = [], 0
+        for _ in range(self.args.max_attempts):
+            _, assignments, _ = draw.current()
+            free = [seed for seed in bracket.tiles_for(player) if seed not in set(assignments.values())]
+            if not free:
+                break
+            seed = rng.choice(free)
+            self.think(rng)
+            attempt_start = time.perf_counter()
+            try:
+                draw.claim(player, seed, time.strftime("%Y-%m-%d %H:%M:%S"))
+            except SeedConflictError:
+                attempts_ms.append((time.perf_counter() - attempt_start) * 1000)
+                conflicts += 1
+                continue
+            attempts_ms.append((time.perf_counter() - attempt_start) * 1000)
+            self.record(player, seed, sum(attempts_ms), attempts_ms, conflicts)
+            return
+        self.failures.append(f"{player}: not seeded after {len(attempts_ms)} attempts")
+
+    def run_player(self, player):
+        try:
+            if self.args.mode == "app":
+                self.run_app_player(player)
+            else:
+                self.run_direct_player(player)
+        except Exception as e:
+            self.failures.append(f"{player}: {type(e).__name__}: {e}")
+
+
+def _sheet_rows():
+    from utils.google_sheets import get_worksheet
+
+    values = get_worksheet().get_all_values()
+    return [row for row in values[1:] if row]
+
+
+def _wait_for_writes(timeout=60):
+    from utils.sheet import pending_assignments
+
+    deadline = time.monotonic() + timeout
+    while pending_assignments() and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+
+def check_integrity(told, rows):
+    """Compare what players were told with what reached the sheet"""
+    in_sheet = {}
+    duplicate_rows = 0
+    for player, seed, *_ in rows:
+        if player in in_sheet:
+            duplicate_rows += 1
+            if in_sheet[player] != seed:
+                in_sheet[player] = None
+            continue
+        in_sheet[player] = seed
+    seeds = [seed for seed in in_sheet.values() if seed is not None]
+    return {
+        "rows": len(rows),
+        "duplicate_rows": duplicate_rows,
+        "players_with_two_seeds": sorted(p for p, s in in_sheet.items() if s is None),
+        "seeds_given_twice": sorted({s for s in seeds if seeds.count(s) > 1}),
+        "lost": sorted(p for p, s in told.items() if p not in in_sheet),
+        "mismatched": sorted(p for p, s in told.items() if p in in_sheet and in_sheet[p] not in (s, None)),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="seed_load_")
+    cassette = os.path.join(workdir, "cassettes", "title-FIXTURES", "seed.json")
+    os.makedirs(os.path.dirname(cassette))
+    with open(cassette, "w", encoding="utf-8") as f:
+        json.dump({"title": "seed", "missing": False, "get_all_values": [["Player", "Seed", "Timestamp"]]}, f)
+    # Secrets are read from .streamlit/ under the working directory, and the ledger,
+    # write-queue journal and file cache all default to paths under cache/
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+
+    from utils.metrics import (RERUN_DURATION, SHEETS_API_CALLS, SHEETS_DEAD_LETTERS, SHEETS_QUOTA_ERRORS,
+                               SHEETS_WRITE_BATCH)
+    from utils.sheet_backend import configure_backend
+
+    configure_backend(
+        mode="replay", path=os.path.join(workdir, "cassettes"), random_seed=args.seed,
+        latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+        quota_error_rate=args.quota_error_rate, auth_error_appends=args.auth_error_appends,
+    )
+    players = [f"player{i:03d}" for i in range(args.players)]
+    sim = Simulation(args, players)
+    os.makedirs(".streamlit")
+    with open(os.path.join(".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        toml.dump(sim.secrets(), f)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency or args.players) as pool:
+        list(pool.map(sim.run_player, players))
+    elapsed = time.perf_counter() - started
+    _wait_for_writes()
+
+    calls = SHEETS_API_CALLS.samples()
+    claims = max(1, len(sim.told))
+    reruns = {page: count for (page,), (_, _, count) in RERUN_DURATION.samples().items()}
+    batches = SHEETS_WRITE_BATCH.samples()
+    report = {
+        "mode": args.mode,
+        "players": args.players,
+        "draw_size": args.size,
+        "seeded": len(sim.told),
+        "failed": sim.failures,
+        "elapsed_s": round(elapsed, 2),
+        "claims_per_s": round(len(sim.told) / elapsed, 2) if elapsed else None,
+        "claim_latency": percentiles(sim.claim_ms),
+        "click_latency": percentiles(sim.attempt_ms),
+        "conflicts": sim.conflicts,
+        "sheets_calls": {f"{ws}.{method}": n for (ws, method), n in sorted(calls.items())},
+        "sheets_calls_per_claim": round(sum(calls.values()) / claims, 2),
+        "quota_errors": sum(SHEETS_QUOTA_ERRORS.samples().values()),
+        "append_batches": sum(count for (_, result), (_, _, count) in batches.items() if result == "ok"),
+        "failed_batches": sum(count for (_, result), (_, _, count) in batches.items() if result == "error"),
+        "dead_letter_rows": sum(SHEETS_DEAD_LETTERS.samples().values()),
+        "reruns": reruns,
+        "reruns_per_player": round(sum(reruns.values()) / max(1, args.players), 2),
+        "integrity": check_integrity(sim.told, _sheet_rows()),
+    }
+    if args.keep:
+        report["workdir"] = workdir
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:>24}: {value}")
+    integrity = report["integrity"]
+    broken = integrity["players_with_two_seeds"] or integrity["seeds_given_twice"] or integrity["lost"] or integrity["mismatched"]
+    return 1 if broken or sim.failures or report["dead_letter_rows"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
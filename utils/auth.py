@@ -1,14 +1,80 @@
-import streamlit as st
+import threading
+
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import streamlit as st
+from google.auth.transport.requests import AuthorizedSession
+from google.oauth2.service_account import Credentials
+
+from utils.http import mount_pool
+from utils.sheet_backend import get_backend_settings, open_client
+
+# The one place Google Sheets clients come from. The service-account key in
+# [gcp_service_account] is parsed once per process, and every loader and the
+# seed page share one gspread client per backend mode. Its AuthorizedSession
+# reuses the access token until it expires (then refreshes it in place) and
+# keeps a pooled keep-alive connection to the Sheets and Drive APIs.
+#
+# set_client() swaps in any gspread-compatible client (an offline stand-in, a
+# benchmark double) for every caller until it is cleared again.
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",
+]
+
+_credentials = None
+_credentials_lock = threading.Lock()
+_clients = {}
+_injected = None
+_lock = threading.Lock()
+
+
+def get_credentials():
+    """Service-account credentials from [gcp_service_account], parsed once per process"""
+    global _credentials
+    with _credentials_lock:
+        if _credentials is None:
+            info = dict(st.secrets["gcp_service_account"])
+            info["private_key"] = info["private_key"].replace("\\n", "\n")
+            _credentials = Credentials.from_service_account_info(info, scopes=SCOPES)
+    return _credentials
+
+
+def _authorize():
+    credentials = get_credentials()
+    # Sheets errors are retried by sheets_io, so the pool itself doesn't retry
+    session = mount_pool(AuthorizedSession(credentials), hosts=2)
+    return gspread.authorize(credentials, session=session)
+
+
+def get_client():
+    """The shared gspread client (or offline stand-in) for the configured backend"""
+    if _injected is not None:
+        return _injected
+    mode = get_backend_settings()["mode"]
+    client = _clients.get(mode)
+    if client is None:
+        with _lock:
+            client = _clients.get(mode)
+            if client is None:
+                client = _clients[mode] = open_client(_authorize)
+    return client
+
+
+def set_client(client):
+    """Make get_client() return client everywhere; None goes back to the configured backend"""
+    global _injected
+    _injected = client
+
+
+def reset_client():
+    """Forget the cached clients and credentials so the next call authorizes again"""
+    global _credentials
+    with _lock:
+        _clients.clear()
+    with _credentials_lock:
+        _credentials = None
+
 
 def init_client():
-    creds_dict = dict(st.secrets["gcp_service_account"])
-    creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(
-        creds_dict,
-        ["https://spreadsheets.google.com/feeds",
-         "https://www.googleapis.com/auth/drive"]
-    )
-    return gspread.authorize(creds) # Initialize and return gspread client
+    return get_client()
@@ -0,0 +1,170 @@
+import hashlib
+import random
+import threading
+
+from .config import get_setting
+
+# Knockout bracket for the cup draw. A draw of size N (a power of two) has
+# N/2 first-round ties lettered A, B, ... Z, AA, AB, ... with two slots each
+# (A1 v A2, B1 v B2, ...); the winners of neighbouring ties meet next round.
+#
+# Byes and pots follow standard seeding positions: seed rank 1 sits in A1 and
+# rank 2 at the top of the other half, so top ranks only meet late. Pot 1 fills the top
+# ranks, pot 2 the next ones and so on, and byes take the slots of the lowest
+# ranks, i.e. the opponents of the top of the draw. Everything random comes
+# from one recorded draw seed, so a draw can be replayed for auditing.
+#
+# Anyone who knows the seed can work out what is under every hidden tile, so
+# it stays secret until the draw is complete. Meanwhile only a commitment is
+# shown: SHA-256 of "<nonce>:<seed>". Once the seed and nonce are revealed,
+# anyone can check them against it.
+
+BYE = "BYE"
+DEFAULT_TITLE = "S8 Knockout Cup Draws"
+
+
+def tie_labels(count):
+    """A, B, ..., Z, AA, AB, ... like spreadsheet columns"""
+    labels = []
+    for i in range(count):
+        label = ""
+        i += 1
+        while i:
+            i, r = divmod(i - 1, 26)
+            label = chr(65 + r) + label
+        labels.append(label)
+    return labels
+
+
+def seeding_order(size):
+    """Seed rank at each bracket position, e.g. [1, 4, 2, 3] for 4"""
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [rank for seed in order for rank in (seed, total - seed)]
+    return order
+
+
+def round_name(players_left):
+    return {2: "Final", 4: "Semi-finals", 8: "Quarter-finals"}.get(players_left, f"Round of {players_left}")
+
+
+class Bracket:
+    def __init__(self, size, players=(), pots=None, draw_seed=0, nonce=""):
+        if size < 2 or size & (size - 1):
+            raise ValueError(f"Draw size must be a power of two, got {size}")
+        players = list(players)
+        if len(players) > size:
+            raise ValueError(f"{len(players)} players don't fit a draw of {size}")
+        if players and len(players) <= size // 2:
+            # Some first-round ties would be BYE v BYE and send a bye into round two
+            fits = 1 << max(1, (len(players) - 1).bit_length())
+            raise ValueError(f"{len(players)} players leave first-round ties of a {size} draw empty; "
+                             f"use a draw size of {fits}")
+        self.size = size
+        self.draw_seed = draw_seed
+        self.nonce = nonce
+        ties = tie_labels(size // 2)
+        # Slot labels in bracket order: A1, A2, B1, B2, ...
+        self.slots = [f"{tie}{side}" for tie in ties for side in (1, 2)]
+        rank_slot = {rank: self.slots[position] for position, rank in enumerate(seeding_order(size))}
+
+        byes = size - len(players) if players else 0
+        self.byes = {rank_slot[rank] for rank in range(size - byes + 1, size + 1)}
+
+        # Pot k gets the next len(pot) ranks; players in no pot share whatever is left
+        self.pot_of = {}
+        self.pot_slots = []
+        rank = 1
+        for pot in pots or []:
+            self.pot_slots.append([rank_slot[r] for r in range(rank, rank + len(pot))])
+            for player in pot:
+                self.pot_of[player] = len(self.pot_slots) - 1
+            rank += len(pot)
+        self.open_slots = [rank_slot[r] for r in range(rank, size - byes + 1)]
+
+    @property
+    def commitment(self):
+        """SHA-256 of "<nonce>:<draw seed>", safe to publish while the draw is open"""
+        return hashlib.sha256(f"{self.nonce}:{self.draw_seed}".encode("utf-8")).hexdigest()
+
+    def is_complete(self, assignments):
+        """True once every slot that isn't a bye has a player"""
+        return set(self.slots) - self.byes <= set(assignments.values())
+
+    def slots_for(self, player):
+        """Slots player may be drawn into, in bracket order"""
+        pot = self.pot_of.get(player)
+        allowed = set(self.open_slots if pot is None else self.pot_slots[pot])
+        return [slot for slot in self.slots if slot in allowed]
+
+    def tiles_for(self, player):
+        """player's hidden tiles: their slots in an order fixed by the draw seed and player"""
+        tiles = self.slots_for(player)
+        random.Random(f"{self.draw_seed}:{player}").shuffle(tiles)
+        return tiles
+
+    def first_round(self, assignments):
+        """[(tie, home, away)] from {player: slot}; unfilled slots are None, byes BYE"""
+        by_slot = {slot: player for player, slot in assignments.items()}
+        by_slot.update({slot: BYE for slot in self.byes})
+        return [(self.slots[i][:-1], by_slot.get(self.slots[i]), by_slot.get(self.slots[i + 1]))
+                for i in range(0, self.size, 2)]
+
+    def fixture_tree(self, assignments):
+        """[(round name, [(match, home, away), ...]), ...] from the first round to the final.
+
+        First-round matches are the tie letters, later ones R16-1, QF1, SF1, F.
+        Players with a bye go straight through; other sides read "Winner <match>"
+        until they are decided.
+        """
+        ties = []
+        entrants = []
+        for tie, home, away in self.first_round(assignments):
+            ties.append((tie, home or "TBD", away or "TBD"))
+            if away == BYE and home:
+                entrants.append(home)
+            elif home == BYE and away:
+                entrants.append(away)
+            else:
+                entrants.append(f"Winner {tie}")
+        rounds = [(round_name(self.size), ties)]
+        while len(entrants) > 1:
+            prefix = _match_prefix(len(entrants))
+            matches = [(f"{prefix}{i // 2 + 1}" if len(entrants) > 2 else prefix, entrants[i], entrants[i + 1])
+                       for i in range(0, len(entrants), 2)]
+            rounds.append((round_name(len(entrants)), matches))
+            entrants = [f"Winner {match}" for match, _, _ in matches]
+        return rounds
+
+
+def _match_prefix(players_left):
+    return {2: "F", 4: "SF", 8: "QF"}.get(players_left, f"R{players_left}-")
+
+
+_brackets = {}
+_brackets_lock = threading.Lock()
+
+
+def get_bracket(players):
+    """The draw's Bracket from [draw] title, size, pots and random_seed, built once per process.
+
+    Without random_seed, the seed is generated once and stored in the seed
+    claims ledger, so every process shares it. The nonce is stored there too.
+    """
+    from .seed_claims import draw_secrets
+
+    title = get_setting("draw", "title", DEFAULT_TITLE)
+    size = int(get_setting("draw", "size", 32))
+    pots = [list(pot) for pot in get_setting("draw", "pots", [])]
+    configured_seed = get_setting("draw", "random_seed")
+    key = (title, size, tuple(players), tuple(map(tuple, pots)), configured_seed)
+    with _brackets_lock:
+        bracket = _brackets.get(key)
+        if bracket is None:
+            # A new title, size, player list or pots is a new draw with its own seed
+            draw_id = hashlib.sha256(repr(key[:4]).encode("utf-8")).hexdigest()[:16]
+            stored_seed, nonce = draw_secrets(draw_id)
+            draw_seed = stored_seed if configured_seed is None else configured_seed
+            bracket = _brackets[key] = Bracket(size, players, pots, draw_seed, nonce)
+    return bracket
@@ -0,0 +1,104 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from cachetools import LRUCache
+
+from utils.config import get_setting
+from utils.metrics import CACHE_REQUESTS
+from utils.tracing import span, traced
+
+# Seasonal performance chart. The position series for any number of players is
+# built in one vectorized step from Dataset.seasonal_performance, and the
+# finished Vega-Lite spec is cached per (players, season window, data version).
+
+_specs = LRUCache(maxsize=int(get_setting("charts", "cache_size", 256)))
+_specs_lock = threading.Lock()
+
+
+@traced("chart.data")
+def seasonal_chart_data(performance, players, seasons, window_seasons):
+    """One row per (season, player): plot position, division and tooltip label.
+
+    Division 1 positions are inverted (1 -> 45) and Division 2 positions are
+    negated (1 -> -1), so up is always better; seasons a player missed, or that
+    fall outside the window, are DP (0).
+    """
+    grid = pd.MultiIndex.from_product([seasons, players], names=["Season", "Player"]).to_frame(index=False)
+    played = performance[performance["Player"].isin(players) & performance["Season"].isin(window_seasons)]
+    df = grid.merge(played, on=["Season", "Player"], how="left")
+
+    position = df["Position"].to_numpy(dtype=float)
+    div1 = (df["Division"] == "Division 1").to_numpy()
+    missing = df["Division"].isna().to_numpy()
+    df["Position"] = np.where(missing, 0, np.where(div1, 46 - position, -position)).astype(int)
+    label = pd.Series(np.where(div1, "DIV 1: ", "DIV 2: "), index=df.index) + pd.Series(np.nan_to_num(position), index=df.index).astype(int).astype(str)
+    df["DisplayLabel"] = label.where(~missing, "DP (Didn't Participate)")
+    df["Division"] = df["Division"].fillna("DP")
+    df["Player"] = df["Player"].str.title()
+    return df
+
+
+def _scale_range(df):
+    # Largest absolute position, rounded up to a multiple of 5 for a cleaner scale
+    positions = df.loc[df["Position"] != 0, "Position"].abs()
+    if positions.empty:
+        return 30
+    return max(int((positions.max() * 1.1 + 4) / 5) * 5, 10)
+
+
+def _build_spec(df, seasons):
+    # altair is only needed once a chart is drawn, not on every page load
+    import altair as alt
+
+    scale_range = _scale_range(df)
+
+    # Main line chart for non-DP data
+    main_chart = alt.Chart(df[df["Position"] != 0]).mark_line(point=True, size=2, opacity=0.8).encode(
+        x=alt.X('Season:N', sort=seasons, title='Season', axis=alt.Axis(labelAngle=0, labelPadding=10)),
+        y=alt.Y('Position:Q',
+                scale=alt.Scale(domain=[-scale_range, scale_range], zero=True),
+                axis=alt.Axis(
+                    labelExpr="datum.value == 0 ? 'DP' : datum.value > 0 ? 'DIV 1: ' + (46 - datum.value) : 'DIV 2: ' + (-datum.value)",
+                    labelAngle=0
+                ),
+                title=None),
+        color=alt.Color('Player:N', scale=alt.Scale(scheme='category10'), legend=alt.Legend(orient='right', titleFontSize=12, labelFontSize=11)),
+        tooltip=['Player:N', 'Season:N', 'DisplayLabel:N', 'Division:N']
+    )
+
+    # White dotted reference line at y=0 (DP line) that spans the entire chart
+    dp_reference = alt.Chart(pd.DataFrame({'y': [0]})).mark_rule(
+        strokeDash=[3, 3],
+        size=5,
+        opacity=0.8,
+        color='#FFFFFF'
+    ).encode(y='y:Q')
+
+    # At least 120px per season to prevent cutoff
+    chart_width = max(800, len(seasons) * 120)
+
+    chart = (main_chart + dp_reference).properties(
+        title=alt.TitleParams(text='Seasonal Performance Comparison', anchor='middle', align='center'),
+        height=500,
+        width=chart_width
+    ).interactive()
+    with span("chart.to_dict"):
+        return chart.to_dict()
+
+
+def seasonal_chart_spec(dataset, players, season_limit):
+    """Vega-Lite spec comparing players' seasonal positions, cached per data version"""
+    key = (tuple(players), season_limit, dataset.version)
+    with _specs_lock:
+        spec = _specs.get(key)
+    if spec is not None:
+        CACHE_REQUESTS.inc(cache="chart_spec", name="seasonal_performance", result="hit")
+        return spec
+    CACHE_REQUESTS.inc(cache="chart_spec", name="seasonal_performance", result="miss")
+    window_seasons = dataset.window(season_limit)["seasons"]
+    df = seasonal_chart_data(dataset.seasonal_performance, list(players), dataset.seasons, window_seasons)
+    spec = _build_spec(df, dataset.seasons)
+    with _specs_lock:
+        _specs[key] = spec
+    return spec
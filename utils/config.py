@@ -7,3 +7,10 @@ def get_season_urls():
     urls = dict(st.secrets["players"])
     urls.pop("APP_TITLE", None)
     return urls
+
+def get_setting(section, key, default=None):
+    """Read an optional value from st.secrets, falling back to default"""
+    try:
+        return st.secrets[section][key]
+    except Exception:
+        return default
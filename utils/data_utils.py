@@ -1,11 +1,14 @@
 import re
+import hashlib
 import pandas as pd
 import streamlit as st
 import os
 import pickle
 import time
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+from utils.tracing import span, traced
+from utils.metrics import CACHE_REQUESTS, mark_cache_miss
+from utils import sheets_io
+from utils.sheets_io import get_worksheet_or_none
 
 # Example usage in your app:
 # from fun_messages import get_random_loading_message
@@ -26,265 +29,220 @@ def display_division_name(division):
     }
     return mapping.get(division, division)
 
+def _fixture(season, division, current_round, row):
+    home, away = row[2].strip(), row[3].strip()
+    try:
+        home_leg1, away_leg1 = int(row[4]), int(row[5])
+    except:
+        home_leg1, away_leg1 = None, None
+    try:
+        home_leg2, away_leg2 = int(row[7]), int(row[8])
+    except:
+        home_leg2, away_leg2 = None, None
+    return {
+        "season": season,
+        "division": division,
+        "round": current_round,
+        "home": home,
+        "away": away,
+        "home_leg1": home_leg1,
+        "away_leg1": away_leg1,
+        "home_leg2": home_leg2,
+        "away_leg2": away_leg2,
+    }
+
+@traced("parse.division_fixtures")
+def parse_division_rows(data, season, division):
+    fixtures = []
+    current_round = None
+    for row in data:
+        # Detect round row
+        if any("ROUND" in str(cell).upper() for cell in row if cell):
+            current_round = clean_round_name(" ".join([c for c in row if c]).strip())
+            continue
+        # Parse fixture row
+        if len(row) >= 9 and row[2] and row[3]:
+            fixtures.append(_fixture(season, division, current_round, row))
+    return fixtures
+
+@traced("parse.cup_fixtures")
+def parse_cup_rows(data, season):
+    fixtures = []
+    current_round = None
+    for row in data:
+        # Detect Cup round header (e.g., "Playoffs", "R of 32", etc.)
+        if len([c for c in row if c]) == 1 and not row[2:4]:
+            current_round = " ".join([c for c in row if c]).strip()
+            continue
+        if len(row) >= 9 and row[2] and row[3]:
+            fixtures.append(_fixture(season, "Cup", current_round, row))
+    return fixtures
+
 def load_fixtures(sheet, season, divisions=["Div1_Fixtures", "Div2_Fixtures"], cup_sheet="Cup_Fixtures"):
-    import time
     all_fixtures = []
 
-    # Helper to safely get worksheet with delay
-    def safe_get_worksheet(name):
-        try:
-            ws = sheet.worksheet(name)
-            time.sleep(1)  
-            return ws
-        except Exception as e:
-            print(f"Could not load worksheet '{name}': {e}")
-            return None
-
     # Division Fixtures
     for division in divisions:
-        ws = safe_get_worksheet(division)
+        ws = get_worksheet_or_none(sheet, division)
         if not ws:
             continue
-        data = ws.get_all_values()
-        current_round = None
-        for row in data:
-            # Detect round row
-            if any("ROUND" in str(cell).upper() for cell in row if cell):
-                current_round = clean_round_name(" ".join([c for c in row if c]).strip())
-                continue
-            # Parse fixture row
-            if len(row) >= 9 and row[2] and row[3]:
-                home, away = row[2].strip(), row[3].strip()
-                try:
-                    home_leg1, away_leg1 = int(row[4]), int(row[5])
-                except:
-                    home_leg1, away_leg1 = None, None
-                try:
-                    home_leg2, away_leg2 = int(row[7]), int(row[8])
-                except:
-                    home_leg2, away_leg2 = None, None
-                all_fixtures.append({
-                    "season": season,
-                    "division": division,
-                    "round": current_round,
-                    "home": home,
-                    "away": away,
-                    "home_leg1": home_leg1,
-                    "away_leg1": away_leg1,
-                    "home_leg2": home_leg2,
-                    "away_leg2": away_leg2,
-                })
+        data = sheets_io.call(division, "get_all_values", ws.get_all_values)
+        all_fixtures.extend(parse_division_rows(data, season, division))
 
     # Cup Fixtures
-    ws = safe_get_worksheet(cup_sheet)
+    ws = get_worksheet_or_none(sheet, cup_sheet)
     if ws:
-        data = ws.get_all_values()
-        current_round = None
-        for row in data:
-            # Detect Cup round header (e.g., "Playoffs", "R of 32", etc.)
-            if len([c for c in row if c]) == 1 and not row[2:4]:
-                current_round = " ".join([c for c in row if c]).strip()
-                continue
-            if len(row) >= 9 and row[2] and row[3]:
-                home, away = row[2].strip(), row[3].strip()
-                try:
-                    home_leg1, away_leg1 = int(row[4]), int(row[5])
-                except:
-                    home_leg1, away_leg1 = None, None
-                try:
-                    home_leg2, away_leg2 = int(row[7]), int(row[8])
-                except:
-                    home_leg2, away_leg2 = None, None
-                all_fixtures.append({
-                    "season": season,
-                    "division": "Cup",
-                    "round": current_round,
-                    "home": home,
-                    "away": away,
-                    "home_leg1": home_leg1,
-                    "away_leg1": away_leg1,
-                    "home_leg2": home_leg2,
-                    "away_leg2": away_leg2,
-                })
+        data = sheets_io.call(cup_sheet, "get_all_values", ws.get_all_values)
+        all_fixtures.extend(parse_cup_rows(data, season))
 
     return all_fixtures
 
 def get_gspread_client():
-    creds_dict = dict(st.secrets["gcp_service_account"])
-    creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(
-        creds_dict,
-        ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    )
-    return gspread.authorize(creds)
+    # Imported here so gspread and google-auth only load when a sheet is actually read
+    from utils.auth import get_client
+    return get_client()
 
 CACHE_DIR = "cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
 @st.cache_data(show_spinner=False)
 def load_fixtures_by_url(sheet_url, season, divisions=["Div1_Fixtures", "Div2_Fixtures"], cup_sheet="Cup_Fixtures"):
+    mark_cache_miss()
     cache_file = os.path.join(CACHE_DIR, f"fixtures_cache_{season}.pkl")
     cache_age = 24 * 3600  # 1 day
     if os.path.exists(cache_file):
         if time.time() - os.path.getmtime(cache_file) < cache_age:
-            with open(cache_file, "rb") as f:
+            CACHE_REQUESTS.inc(cache="file", name="fixtures", result="hit")
+            with span("cache.file_read"), open(cache_file, "rb") as f:
                 return pickle.load(f)
+    CACHE_REQUESTS.inc(cache="file", name="fixtures", result="miss")
     gc = get_gspread_client()
-    sheet = gc.open_by_url(sheet_url)
-    all_fixtures = []
-    def safe_get_worksheet(name):
-        try:
-            ws = sheet.worksheet(name)
-            time.sleep(5)
-            return ws
-        except Exception as e:
-            print(f"Could not load worksheet '{name}': {e}")
-            return None
-    for division in divisions:
-        ws = safe_get_worksheet(division)
-        if not ws:
-            continue
-        data = ws.get_all_values()
-        current_round = None
-        for row in data:
-            if any("ROUND" in str(cell).upper() for cell in row if cell):
-                current_round = clean_round_name(" ".join([c for c in row if c]).strip())
-                continue
-            if len(row) >= 9 and row[2] and row[3]:
-                home, away = row[2].strip(), row[3].strip()
-                try:
-                    home_leg1, away_leg1 = int(row[4]), int(row[5])
-                except:
-                    home_leg1, away_leg1 = None, None
-                try:
-                    home_leg2, away_leg2 = int(row[7]), int(row[8])
-                except:
-                    home_leg2, away_leg2 = None, None
-                all_fixtures.append({
-                    "season": season,
-                    "division": division,
-                    "round": current_round,
-                    "home": home,
-                    "away": away,
-                    "home_leg1": home_leg1,
-                    "away_leg1": away_leg1,
-                    "home_leg2": home_leg2,
-                    "away_leg2": away_leg2,
-                })
-    ws = safe_get_worksheet(cup_sheet)
-    if ws:
-        data = ws.get_all_values()
-        current_round = None
-        for row in data:
-            if len([c for c in row if c]) == 1 and not row[2:4]:
-                current_round = " ".join([c for c in row if c]).strip()
-                continue
-            if len(row) >= 9 and row[2] and row[3]:
-                home, away = row[2].strip(), row[3].strip()
-                try:
-                    home_leg1, away_leg1 = int(row[4]), int(row[5])
-                except:
-                    home_leg1, away_leg1 = None, None
-                try:
-                    home_leg2, away_leg2 = int(row[7]), int(row[8])
-                except:
-                    home_leg2, away_leg2 = None, None
-                all_fixtures.append({
-                    "season": season,
-                    "division": "Cup",
-                    "round": current_round,
-                    "home": home,
-                    "away": away,
-                    "home_leg1": home_leg1,
-                    "away_leg1": away_leg1,
-                    "home_leg2": home_leg2,
-                    "away_leg2": away_leg2,
-                })
+    sheet = sheets_io.call("(spreadsheet)", "open_by_url", gc.open_by_url, sheet_url)
+    all_fixtures = load_fixtures(sheet, season, divisions, cup_sheet)
     with open(cache_file, "wb") as f:
         pickle.dump(all_fixtures, f)
     return all_fixtures
 
-@st.cache_data(show_spinner=False)
-def load_table_by_url(sheet_url, season):
-    cache_file = os.path.join(CACHE_DIR, f"table_cache_{season}.csv")
-    cache_age = 24 * 3600  # 1 day
-    if os.path.exists(cache_file):
-        if time.time() - os.path.getmtime(cache_file) < cache_age:
-            return pd.read_csv(cache_file)
-    gc = get_gspread_client()
-    sheet = gc.open_by_url(sheet_url)
-    
+# League dashboard layout: a header row naming the "Twitter Handles" column
+# ("Names" in Season 2), the Division 1 rows, then from Season 5 a
+# "... SEASON n (DIV 2)" marker row and the Division 2 rows (usually under a
+# repeated header). Earlier seasons had a single division.
+LEAGUE_HEADERS = ["Twitter Handles", "Names"]
+DIVISIONS = ["Division 1", "Division 2"]
+NUMERIC_COLUMNS = ["Position", "MP", "W", "D", "L", "GF", "GA", "GD", "Points"]
+
+def _league_worksheet(sheet, season):
     # Try different worksheet naming patterns
     worksheet_names = [
         f"LEAGUE DASHBOARD-{season}",  # Standard format (S1, S3, S4, S5, S6)
         "LEAGUE DASHBOARD"             # Season 2 format
     ]
-    
-    ws = None
     for name in worksheet_names:
-        try:
-            ws = sheet.worksheet(name)
-            break
-        except:
-            continue
-    
-    if ws is None:
-        return pd.DataFrame()
-    data = ws.get_all_values()
-    df = pd.DataFrame(data)
-    header_row = None
-    for i, row in df.iterrows():
-        # Check for both "Twitter Handles" (standard) and "Names" (Season 2)
-        if "Twitter Handles" in row.values or "Names" in row.values:
-            header_row = i
-            break
-    if header_row is None:
-        return pd.DataFrame()
-    df.columns = [str(c).strip() for c in df.iloc[header_row]]
-    df = df[header_row + 1:]
+        ws = get_worksheet_or_none(sheet, name)
+        if ws is not None:
+            return ws
+    return None
+
+def _whole_numbers(column):
+    """column as nullable integers if every non-blank cell is a whole number, else unchanged"""
+    text = column.str.replace(",", "", regex=False).str.strip()
+    values = pd.to_numeric(text, errors="coerce")
+    if values[text != ""].isna().any() or (values.dropna() % 1 != 0).any():
+        return column
+    return values.astype("Int64")
+
+def _row_has(cells, text):
+    return cells.apply(lambda col: col.str.contains(text, regex=False)).to_numpy().any(axis=1)
+
+@traced("parse.league_table")
+def parse_league_tables(data, season):
+    """{"Division 1": table, "Division 2": table} from a league dashboard grid.
+
+    Header and DIV 2 marker rows are found with one mask over the whole grid,
+    and both divisions are sliced out in the same pass. Marker, header and
+    blank rows are dropped and numeric columns become nullable integers.
+    """
+    tables = {division: pd.DataFrame() for division in DIVISIONS}
+    grid = pd.DataFrame(data).fillna("").astype(str)
+    if grid.empty:
+        return tables
+    cells = grid.apply(lambda col: col.str.strip())
+    is_header = cells.isin(LEAGUE_HEADERS).to_numpy().any(axis=1)
+    if not is_header.any():
+        return tables
+    start = int(is_header.argmax())
+    upper = cells.apply(lambda col: col.str.upper())
+    is_marker = _row_has(upper, "SEASON") & _row_has(upper, "DIV 2")
+    is_marker[:start] = False
+    if int(season.replace('S', '')) < 5:
+        is_marker[:] = False  # Divisions only started from Season 5
+    in_div2 = is_marker.cumsum() > 0
+
+    columns = list(cells.iloc[start])
+    df = cells.set_axis(columns, axis=1)
     df = df.loc[:, ~df.columns.duplicated()]
-    df = df.reset_index(drop=True)
-    
     # Normalize column name: rename "Names" to "Twitter Handles" for consistency
     if "Names" in df.columns and "Twitter Handles" not in df.columns:
         df = df.rename(columns={"Names": "Twitter Handles"})
-    
-    df.to_csv(cache_file, index=False)
-    return df
+    keep = ~is_header & ~is_marker & (df["Twitter Handles"] != "").to_numpy()
+    keep[:start] = False
 
-def load_table(sheet, season):
-    # Try different worksheet naming patterns
-    worksheet_names = [
-        f"LEAGUE DASHBOARD-{season}",  # Standard format (S1, S3, S4, S5, S6)
-        "LEAGUE DASHBOARD"             # Season 2 format
-    ]
-    
-    ws = None
-    for name in worksheet_names:
-        try:
-            ws = sheet.worksheet(name)
-            break
-        except:
-            continue
-    
-    if ws is None:
+    body, in_div2 = df[keep].copy(), in_div2[keep]
+    for column in NUMERIC_COLUMNS:
+        if column in body.columns:
+            body[column] = _whole_numbers(body[column])
+    for division, rows in (("Division 1", ~in_div2), ("Division 2", in_div2)):
+        if rows.any():
+            tables[division] = body[rows].reset_index(drop=True)
+    return tables
+
+def combine_divisions(tables):
+    """One table for a season, with each row's division in a "Division" column"""
+    frames = [table.assign(Division=division) for division, table in tables.items() if not table.empty]
+    if not frames:
         return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
 
-    data = ws.get_all_values()
-    df = pd.DataFrame(data)
+@st.cache_data(show_spinner=False)
+def load_table_by_url(sheet_url, season):
+    """The season's league tables split by division, see parse_league_tables()"""
+    mark_cache_miss()
+    cache_file = os.path.join(CACHE_DIR, f"tables_cache_{season}.pkl")
+    cache_age = 24 * 3600  # 1 day
+    if os.path.exists(cache_file):
+        if time.time() - os.path.getmtime(cache_file) < cache_age:
+            CACHE_REQUESTS.inc(cache="file", name="table", result="hit")
+            with span("cache.file_read"), open(cache_file, "rb") as f:
+                return pickle.load(f)
+    CACHE_REQUESTS.inc(cache="file", name="table", result="miss")
+    gc = get_gspread_client()
+    sheet = sheets_io.call("(spreadsheet)", "open_by_url", gc.open_by_url, sheet_url)
+    ws = _league_worksheet(sheet, season)
+    if ws is None:
+        return parse_league_tables([], season)
+    data = sheets_io.call(ws.title, "get_all_values", ws.get_all_values)
+    tables = parse_league_tables(data, season)
+    with open(cache_file, "wb") as f:
+        pickle.dump(tables, f)
+    return tables
 
-    header_row = None
-    for i, row in df.iterrows():
-        if "Twitter Handles" in row.values:
-            header_row = i
-            break
-    if header_row is None:
+def load_table(sheet, season):
+    ws = _league_worksheet(sheet, season)
+    if ws is None:
         return pd.DataFrame()
+    data = sheets_io.call(ws.title, "get_all_values", ws.get_all_values)
+    return combine_divisions(parse_league_tables(data, season))
 
-    df.columns = [str(c).strip() for c in df.iloc[header_row]]
-    df = df[header_row + 1:]
-    df = df.loc[:, ~df.columns.duplicated()]
-    return df.reset_index(drop=True)
+@traced("data.version")
+def compute_data_version(fixtures, tables):
+    """Short digest of the loaded fixtures and tables, used to key rendered fragments"""
+    digest = hashlib.sha1()
+    for f in fixtures:
+        digest.update(repr(sorted(f.items())).encode("utf-8"))
+    for season in sorted(tables):
+        digest.update(season.encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(tables[season], index=False).values.tobytes())
+    return digest.hexdigest()[:16]
 
 def get_h2h(fixtures, p1, p2):
     matches, w, d, l = [], 0, 0, 0
@@ -0,0 +1,133 @@
+import threading
+
+import pandas as pd
+
+from utils.data_utils import load_fixtures_by_url, load_table_by_url, combine_divisions, compute_data_version
+from utils.h2h import get_player_stats, season_standings
+from utils.roast_digest import build_prompt_digests
+from utils.metrics import cached_call
+from utils.sheets_io import SheetsUnavailableError
+from utils.tracing import span
+
+# The loaded, normalized fixtures and tables, built once per process and shared
+# read-only by every session and every fragment rerun. Widgets only select
+# from it; nothing here is recomputed on a rerun.
+
+_datasets = {}
+_lock = threading.Lock()
+
+
+class Dataset:
+    """Normalized fixtures and tables for all seasons, plus derived lookups"""
+
+    def __init__(self, fixtures, tables, failed_seasons):
+        self.fixtures = fixtures
+        self.tables = tables
+        self.seasons = sorted(tables)
+        self.failed_seasons = failed_seasons
+        with span("data.players"):
+            players_raw = set(f["home"] for f in fixtures) | set(f["away"] for f in fixtures)
+            self.players = sorted({p for p in players_raw if p})
+        self.version = compute_data_version(fixtures, tables)
+        self._windows = {}
+        self._stats = {}
+        self._performance = None
+        self._digests = None
+        self._lock = threading.Lock()
+
+    @property
+    def seasonal_performance(self):
+        """Division and position of every player in every season (Player, Season, Division, Position)"""
+        if self._performance is None:
+            with span("data.seasonal_performance"):
+                frames = [season_standings(self.tables[s], s) for s in self.seasons]
+                if frames:
+                    self._performance = pd.concat(frames, ignore_index=True)
+                else:
+                    self._performance = season_standings(pd.DataFrame(), None)
+        return self._performance
+
+    def prompt_digest(self, player):
+        """Name-free stats summary for roasting this player, built for all players on first use"""
+        if self._digests is None:
+            digests = build_prompt_digests(self)
+            with self._lock:
+                self._digests = digests
+        return self._digests.get(player, "No stats found.")
+
+    def window(self, season_limit):
+        """Seasons, fixtures and tables for the last season_limit seasons"""
+        with self._lock:
+            window = self._windows.get(season_limit)
+        if window is None:
+            seasons = self.seasons[-season_limit:]
+            selected = set(seasons)
+            window = {
+                "seasons": seasons,
+                "fixtures": [f for f in self.fixtures if f["season"] in selected],
+                "tables": {s: self.tables[s] for s in seasons},
+            }
+            with self._lock:
+                self._windows[season_limit] = window
+        return window
+
+    def player_stats(self, player, season_limit):
+        """get_player_stats() for a season window, computed once per player and window"""
+        key = (player, season_limit)
+        with self._lock:
+            stats = self._stats.get(key)
+        if stats is None:
+            window = self.window(season_limit)
+            stats = get_player_stats(player, window["tables"], window["fixtures"])
+            with self._lock:
+                self._stats[key] = stats
+        return stats
+
+
+def _load_season(season, url):
+    with span("load_fixtures_by_url"):
+        fixtures = cached_call("fixtures", load_fixtures_by_url, url, season)
+    with span("load_table_by_url"):
+        divisions = cached_call("table", load_table_by_url, url, season)
+    # One table per season with a Division column; the cached split tables stay untouched
+    table = combine_divisions(divisions)
+    # Normalize player names to lowercase to avoid duplicates
+    with span("normalize.fixture_names"):
+        for f in fixtures:
+            f["home"] = f["home"].lower().strip()
+            f["away"] = f["away"].lower().strip()
+    with span("normalize.table_names"):
+        if not table.empty and "Twitter Handles" in table.columns:
+            table["Twitter Handles"] = table["Twitter Handles"].astype(str).str.lower().str.strip()
+    return fixtures, table
+
+
+def build_dataset(season_urls):
+    all_fixtures, all_tables, failed = [], {}, []
+    for season, url in season_urls.items():
+        try:
+            fixtures, table = _load_season(season, url)
+        except SheetsUnavailableError:
+            failed.append(season)
+            all_tables[season] = pd.DataFrame()
+            continue
+        all_fixtures.extend(fixtures)
+        all_tables[season] = table
+    return Dataset(all_fixtures, all_tables, failed)
+
+
+def get_dataset(season_urls):
+    """The shared dataset for these seasons; loaded once, concurrent first loads wait for it"""
+    key = tuple(season_urls.items())
+    dataset = _datasets.get(key)
+    if dataset is not None:
+        return dataset
+    with _lock:
+        dataset = _datasets.get(key)
+        if dataset is None:
+            with span("data.load"):
+                dataset = build_dataset(season_urls)
+            # Nothing is kept for a failed season, so the next rerun tries again
+            if not dataset.failed_seasons:
+                _datasets[key] = dataset
+    return dataset
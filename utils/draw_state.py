@@ -0,0 +1,108 @@
+import threading
+import time
+
+from .config import get_setting
+from .seed_claims import claim_seed, load_claims
+
+# Live state of the cup draw, shared by every session in the process.
+# Claims made here are published straight away; changes made elsewhere (other
+# server processes, edits to the sheet) are picked up by one session at a time
+# reconciling with load_claims() every [draw] refresh seconds. Each change
+# bumps the version and wakes subscribers, so sessions redraw the tile grid
+# from memory instead of each re-reading the sheet.
+
+
+class DrawState:
+    def __init__(self, refresh):
+        self.refresh = refresh
+        self.version = 0
+        self.assignments = None
+        self.error = None
+        self._refreshed_at = 0.0
+        self._cond = threading.Condition()
+        self._refresh_lock = threading.Lock()
+        self._subscribers = []
+
+    def publish(self, assignments):
+        """Replace the assignments; bumps the version and notifies subscribers if anything changed"""
+        with self._cond:
+            self.error = None
+            if assignments == self.assignments:
+                return self.version
+            self.assignments = dict(assignments)
+            self.version += 1
+            version, subscribers = self.version, list(self._subscribers)
+            self._cond.notify_all()
+        for callback in subscribers:
+            callback(version, dict(assignments))
+        return version
+
+    def subscribe(self, callback):
+        """Call callback(version, assignments) after every change; returns an unsubscribe function"""
+        with self._cond:
+            self._subscribers.append(callback)
+        return lambda: self._unsubscribe(callback)
+
+    def _unsubscribe(self, callback):
+        with self._cond:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the version moves past version; returns the current version"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def snapshot(self):
+        with self._cond:
+            assignments = None if self.assignments is None else dict(self.assignments)
+            return self.version, assignments, self.error
+
+    def _reconcile(self):
+        assignments, error = load_claims()
+        self._refreshed_at = time.monotonic()
+        if error:
+            with self._cond:
+                self.error = error
+        else:
+            self.publish(assignments)
+
+    def current(self):
+        """(version, assignments, error), reconciling with the sheet if it's due"""
+        due = time.monotonic() - self._refreshed_at >= self.refresh
+        # Only the first caller waits; later ones get the last published state meanwhile
+        if due and self._refresh_lock.acquire(blocking=self.assignments is None):
+            try:
+                if time.monotonic() - self._refreshed_at >= self.refresh or self.assignments is None:
+                    self._reconcile()
+            finally:
+                self._refresh_lock.release()
+        return self.snapshot()
+
+    def claim(self, player, seed, timestamp):
+        """claim_seed(), then publish the new assignment to every session"""
+        try:
+            ticket = claim_seed(player, seed, timestamp)
+        except Exception:
+            # Our view was out of date; the next current() reconciles
+            self._refreshed_at = 0.0
+            raise
+        with self._cond:
+            assignments = dict(self.assignments or {})
+        assignments[player] = seed
+        self.publish(assignments)
+        return ticket
+
+
+_draw = None
+_draw_lock = threading.Lock()
+
+
+def get_draw_state():
+    """The process-wide draw state, refreshed every [draw] refresh seconds (default 2)"""
+    global _draw
+    with _draw_lock:
+        if _draw is None:
+            _draw = DrawState(refresh=float(get_setting("draw", "refresh", 2)))
+    return _draw
@@ -0,0 +1,65 @@
+import os
+import threading
+from functools import lru_cache
+
+from cachetools import LRUCache
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from utils.config import get_setting
+from utils.metrics import CACHE_REQUESTS
+from utils.tracing import span
+
+# HTML fragments for the comparison page, rendered from Jinja2 templates in
+# utils/templates. Templates are compiled once per process and rendered
+# fragments are kept in an LRU keyed by whatever identifies their inputs
+# (player, season window, data version).
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    trim_blocks=True,
+    lstrip_blocks=True,
+    auto_reload=False,
+)
+_templates = {name: _env.get_template(name) for name in _env.list_templates(extensions=["html"])}
+
+_cache = LRUCache(maxsize=int(get_setting("fragments", "cache_size", 512)))
+_cache_lock = threading.Lock()
+
+
+def _compact(html):
+    # One line, no indentation: keeps Markdown from turning indented HTML into code blocks
+    return "".join(line.strip() for line in html.splitlines())
+
+
+def render(template_name, **context):
+    with span(f"html.render[{template_name}]"):
+        return _compact(_templates[template_name].render(**context))
+
+
+def render_cached(name, key, build_context):
+    """Render a template once per key; build_context() is only called on a miss.
+
+    A key of None renders without caching.
+    """
+    if key is None:
+        return render(name, **build_context())
+    cache_key = (name,) + tuple(key)
+    with _cache_lock:
+        html = _cache.get(cache_key)
+    if html is not None:
+        CACHE_REQUESTS.inc(cache="fragment", name=name, result="hit")
+        return html
+    CACHE_REQUESTS.inc(cache="fragment", name=name, result="miss")
+    html = render(name, **build_context())
+    with _cache_lock:
+        _cache[cache_key] = html
+    return html
+
+
+@lru_cache(maxsize=None)
+def load_stylesheet(name):
+    with open(os.path.join(TEMPLATE_DIR, "css", name), "r", encoding="utf-8") as f:
+        return f.read()
@@ -1,16 +1,41 @@
-import gspread
-from google.oauth2.service_account import Credentials
-import streamlit as st
+import threading
 
-def get_worksheet():
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=scopes)
-    client = gspread.authorize(creds)
+from .auth import get_client
+from .config import get_setting
+from . import sheets_io
+
+# One seed worksheet handle per process, shared by every session and opened
+# through the shared client from utils/auth.py, so a seed click only costs
+# the read or append it makes.
+
+SEED_SPREADSHEET_TITLE = "FIXTURES"
+SEED_WORKSHEET = "seed"
 
-    sheet = client.open("FIXTURES")
-    worksheet = sheet.worksheet("seed")
+_worksheets = {}
+_lock = threading.Lock()
+
+def _open_worksheet(client, key):
+    if key:
+        sheet = sheets_io.call("(spreadsheet)", "open_by_key", client.open_by_key, key)
+    else:
+        # Without [seed_sheet] key this costs a Drive title search, but only once per process
+        sheet = sheets_io.call("(spreadsheet)", "open", client.open, SEED_SPREADSHEET_TITLE)
+    return sheets_io.call(SEED_WORKSHEET, "worksheet", sheet.worksheet, SEED_WORKSHEET)
+
+def get_worksheet():
+    """The seed worksheet, opened once per process by [seed_sheet] key (or by title if unset)"""
+    client = get_client()
+    # Keyed by the client itself, so switching backend or injecting a client reopens it
+    cache_key = (id(client), get_setting("seed_sheet", "key"))
+    cached = _worksheets.get(cache_key)
+    if cached is None or cached[0] is not client:
+        with _lock:
+            cached = _worksheets.get(cache_key)
+            if cached is None or cached[0] is not client:
+                cached = _worksheets[cache_key] = (client, _open_worksheet(client, cache_key[1]))
+    return cached[1]
 
-    return worksheet
+def invalidate_worksheet():
+    """Drop the cached worksheet handle so the next call reopens it"""
+    with _lock:
+        _worksheets.clear()
@@ -1,12 +1,20 @@
 import streamlit as st
 import pandas as pd
 from utils.data_utils import get_h2h, display_division_name
+from utils.tracing import traced
+from utils.fragments import render_cached
+from utils.layout import inject_stylesheets
 
 
 def get_player_division(player, df, season):
     """Determine which division a player is in based on table structure"""
     if df.empty or "Twitter Handles" not in df.columns:
         return "Unknown"
+
+    # Tables from parse_league_tables() already carry each row's division
+    if "Division" in df.columns:
+        match = df.loc[df["Twitter Handles"].str.lower().str.strip() == player.lower().strip(), "Division"]
+        return match.iloc[0] if not match.empty else "Unknown"
     
     # Extract season number for comparison (e.g., "S5", "S6", "S7")
     season_num = season.replace('S', '')
@@ -68,6 +76,62 @@ def get_player_division(player, df, season):
     return "Unknown"
 
 
+@traced("season_standings")
+def season_standings(table, season):
+    """Division and position of every player in one season's table, in one pass.
+
+    Uses the same rules as get_player_division() and get_player_stats().
+    """
+    columns = ["Player", "Season", "Division", "Position"]
+    if table.empty or "Twitter Handles" not in table.columns:
+        return pd.DataFrame(columns=columns)
+    if "Division" in table.columns:
+        return _division_standings(table, season, columns)
+    pre_divisions = int(season.replace('S', '')) < 5
+    has_position = 'Position' in table.columns
+    rows, seen = [], set()
+    div2_section_started = False
+    for index, row in zip(table.index, table.to_dict('records')):
+        if not pre_divisions:
+            row_text = ' '.join([str(val) for val in row.values() if pd.notna(val) and val != '']).upper()
+            if 'SEASON' in row_text and 'DIV 2' in row_text:
+                div2_section_started = True
+                continue
+        handle = row.get('Twitter Handles', '')
+        if not pd.notna(handle):
+            continue
+        player = str(handle).lower().strip()
+        if player in seen:
+            continue
+        seen.add(player)
+        position = index + 1
+        if has_position:
+            try:
+                position = int(row['Position'])
+            except (ValueError, TypeError):
+                pass
+        division = "Division 2" if div2_section_started and not pre_divisions else "Division 1"
+        rows.append((player, season, division, position))
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _division_standings(table, season, columns):
+    """season_standings() for a table with a Division column, without scanning rows"""
+    players = table["Twitter Handles"].astype(str).str.lower().str.strip()
+    first = ~players.duplicated()
+    position = pd.Series(table.index + 1, index=table.index)
+    if 'Position' in table.columns:
+        position = pd.to_numeric(table['Position'], errors='coerce').fillna(position)
+    standings = pd.DataFrame({
+        "Player": players,
+        "Season": season,
+        "Division": table["Division"],
+        "Position": position.astype(int),
+    }, columns=columns)
+    return standings[first].reset_index(drop=True)
+
+
+@traced("get_player_stats")
 def get_player_stats(player, tables, fixtures):
     """Get comprehensive player statistics across all seasons"""
     player_stats = {
@@ -202,6 +266,96 @@ def get_player_stats(player, tables, fixtures):
     return player_stats
 
 
+DIVISION_LABELS = {"Div1_Fixtures": "Division 1", "Div2_Fixtures": "Division 2", "Cup": "Cup"}
+
+
+def _highlight(record):
+    if record['score'] == '0-0':
+        return 'None'
+    if record['opponent']:
+        return f"{record['score']} vs {record['opponent'].title()}"
+    return record['score']
+
+
+def player_card_context(player, stats, accent):
+    """Template context for utils/templates/player_card.html"""
+    career = stats['career_totals']
+    win_rate = round((career['W'] / career['MP']) * 100, 1) if career['MP'] > 0 else 0
+    best = stats['best_season']
+    return {
+        'name': player.title(),
+        'accent': accent,
+        'win_rate': win_rate,
+        'win_color': "#28a745" if win_rate >= 50 else "#ffc107" if win_rate >= 30 else "#dc3545",
+        'W': int(career['W']),
+        'D': int(career['D']),
+        'L': int(career['L']),
+        'GF': int(career['GF']),
+        'GA': int(career['GA']),
+        'GD': f"{int(career['GD']):+d}",
+        'seasons_played': len(stats['seasons']),
+        'best_season': f"{best['season']} ({best['division']} - Pos: {best['position']})",
+        'biggest_win': _highlight(stats['highest_win']),
+        'biggest_loss': _highlight(stats['highest_defeat']),
+    }
+
+
+def build_match_history(matches, fixtures):
+    """Template rows for utils/templates/match_history.html"""
+    # Index fixtures once instead of scanning them for every match
+    divisions = {}
+    for f in fixtures:
+        for leg_score in (f['home_leg1'], f['home_leg2']):
+            divisions.setdefault((f['season'], f['home'], f['away'], leg_score), f['division'])
+
+    rows = []
+    for season, rnd, home, away, hs, as_ in matches:
+        decided = hs is not None and as_ is not None
+        division_label = DIVISION_LABELS.get(divisions.get((season, home, away, hs)), "")
+        if rnd:
+            match_label = f"{season} {division_label} {rnd} :"
+        else:
+            match_label = f"{season} {division_label} :"
+        rows.append({
+            'label': match_label.replace('  ', ' ').strip(),
+            'home': home.title(),
+            'away': away.title(),
+            'home_won': decided and hs > as_,
+            'away_won': decided and hs < as_,
+            'decisive': decided and hs != as_,
+            'score': f"{hs if hs is not None else '-'}-{as_ if as_ is not None else '-'}",
+        })
+    return rows
+
+
+def render_player_card(player, get_stats, accent, cache_key):
+    """Render a player's stat card; get_stats(player) is only called on a fragment-cache miss"""
+    html = render_cached(
+        "player_card.html",
+        None if cache_key is None else (player, accent) + tuple(cache_key),
+        lambda: player_card_context(player, get_stats(player), accent),
+    )
+    st.markdown(html, unsafe_allow_html=True)
+
+
+def render_h2h_tiles(player1, player2, w1, d, l1, cache_key):
+    html = render_cached(
+        "h2h_tiles.html",
+        None if cache_key is None else (player1, player2) + tuple(cache_key),
+        lambda: {'player1': player1.title(), 'player2': player2.title(), 'wins': w1, 'draws': d, 'losses': l1},
+    )
+    st.markdown(html, unsafe_allow_html=True)
+
+
+def render_match_history(player1, player2, matches, fixtures, cache_key, title=None):
+    html = render_cached(
+        "match_history.html",
+        None if cache_key is None else (player1, player2, title) + tuple(cache_key),
+        lambda: {'title': title, 'matches': build_match_history(matches, fixtures)},
+    )
+    st.markdown(html, unsafe_allow_html=True)
+
+
 def render_h2h(fixtures_filtered, player1, player2):
     # --- H2H Header ---
     st.markdown(
@@ -312,215 +466,18 @@ def render_h2h(fixtures_filtered, player1, player2):
             </div>""", unsafe_allow_html=True)
 
 
-def render_player_profile(all_fixtures, all_tables, players):
+def render_player_profile(all_fixtures, all_tables, players, cache_key=None):
     """Render the player profile page with sidebar player selection and comparison"""
     
     # Enhanced CSS for modern player profile page
-    st.markdown("""
-        <style>
-            /* Modern dark theme with better contrast */
-            .stApp {
-                background: #3a3a3a !important;
-                min-height: 100vh;
-            }
-            
-            /* Enhanced card styling with modern look */
-            .card {
-                background: linear-gradient(145deg, #ffffff 0%, #f8f9fa 100%) !important;
-                border: none !important;
-                border-radius: 16px !important;
-                box-shadow: 0 8px 32px rgba(0,0,0,0.1) !important;
-                padding: 1.5rem !important;
-                margin-bottom: 1rem !important;
-                color: #2c3e50 !important;
-                transition: transform 0.3s ease, box-shadow 0.3s ease !important;
-            }
-            
-            .card:hover {
-                transform: translateY(-4px) !important;
-                box-shadow: 0 12px 48px rgba(0,0,0,0.15) !important;
-            }
-            
-            .card h3, .card h4 {
-                color: #2c3e50 !important;
-                font-weight: 700 !important;
-                margin-bottom: 1rem !important;
-            }
-            
-            /* Enhanced metric containers */
-            .metric-container {
-                background: linear-gradient(145deg, #ffffff 0%, #f8f9fa 100%);
-                padding: 1.5rem;
-                border-radius: 16px;
-                border: none;
-                box-shadow: 0 4px 16px rgba(0,0,0,0.1);
-                text-align: center;
-                transition: transform 0.3s ease;
-            }
-            
-            .metric-container:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 6px 24px rgba(0,0,0,0.15);
-            }
-            
-            /* Override white text for metric containers - force inline colors to show */
-            .metric-container div[style*="color"] {
-                color: inherit !important;
-            }
-            
-            /* Ensure metric container text is never white */
-            .metric-container div {
-                color: #2c3e50 !important;
-            }
-            
-            .metric-container div[style*="color: #667eea"] {
-                color: #667eea !important;
-            }
-            
-            .metric-container div[style*="color: #28a745"] {
-                color: #28a745 !important;
-            }
-            
-            .metric-container div[style*="color: #ffc107"] {
-                color: #ffc107 !important;
-            }
-            
-            .metric-container div[style*="color: #dc3545"] {
-                color: #dc3545 !important;
-            }
-            
-            .metric-container div[style*="color: #764ba2"] {
-                color: #764ba2 !important;
-            }
-            
-            .metric-container div[style*="color: #6c757d"] {
-                color: #6c757d !important;
-            }
-            
-            /* Better text contrast and typography */
-            .stMarkdown, .stMarkdown p, .stMarkdown div {
-                color: #ffffff !important;
-                font-weight: 500 !important;
-            }
-            
-            /* Section headers with better styling */
-            h1, h2, h3, h4 {
-                color: #ffffff !important;
-                font-weight: 700 !important;
-                text-shadow: 2px 2px 4px rgba(0,0,0,0.3) !important;
-                margin-bottom: 1rem !important;
-            }
-            
-            h3 {
-                font-size: 1.8rem !important;
-                margin-top: 2rem !important;
-            }
-            
-            /* Selectbox and input styling */
-            .stSelectbox label {
-                color: #ffffff !important;
-                font-weight: 600 !important;
-                font-size: 1.1rem !important;
-                text-shadow: 1px 1px 2px rgba(0,0,0,0.3) !important;
-            }
-            
-            .stSelectbox > div > div {
-                background-color: rgba(255,255,255,0.9) !important;
-                border-radius: 12px !important;
-                border: 2px solid rgba(255,255,255,0.2) !important;
-            }
-            
-            /* Dataframe styling */
-            .stDataFrame {
-                background: rgba(255,255,255,0.95) !important;
-                border-radius: 16px !important;
-                box-shadow: 0 4px 16px rgba(0,0,0,0.1) !important;
-                overflow: hidden !important;
-            }
-            
-            /* Metrics styling */
-            .metric-label {
-                color: #ffffff !important;
-                font-weight: 600 !important;
-                text-shadow: 1px 1px 2px rgba(0,0,0,0.3) !important;
-            }
-            
-            /* Info box styling */
-            .stAlert {
-                background: rgba(255,255,255,0.1) !important;
-                border: 2px solid rgba(255,255,255,0.2) !important;
-                border-radius: 12px !important;
-                backdrop-filter: blur(10px) !important;
-            }
-            
-            .stAlert > div {
-                color: #ffffff !important;
-                font-weight: 500 !important;
-            }
-            
-            /* Button styling */
-            .stButton > button {
-                background: linear-gradient(145deg, #667eea 0%, #764ba2 100%) !important;
-                color: white !important;
-                border: none !important;
-                border-radius: 12px !important;
-                font-weight: 600 !important;
-                box-shadow: 0 4px 12px rgba(0,0,0,0.2) !important;
-                transition: all 0.3s ease !important;
-            }
-            
-            .stButton > button:hover {
-                transform: translateY(-2px) !important;
-                box-shadow: 0 6px 20px rgba(0,0,0,0.3) !important;
-            }
-        </style>
-    """, unsafe_allow_html=True)
+    inject_stylesheets("profile.css", "fragments.css")
     
     # Create sidebar for player selection
     with st.sidebar:
         st.markdown("### Select Players")
         
         # Add black background styling to sidebar for better visibility
-        st.markdown("""
-        <style>
-            /* Sidebar background styling */
-            [data-testid="stSidebar"] {
-                background: #000000 !important;
-            }
-            
-            /* Make selectbox text more visible on sidebar */
-            [data-testid="stSidebar"] .stSelectbox label {
-                color: #ffffff !important;
-                font-weight: 600 !important;
-            }
-            
-            /* Style selectbox options - black text on white background */
-            [data-testid="stSidebar"] .stSelectbox > div > div {
-                background-color: rgba(255,255,255,0.95) !important;
-            }
-            
-            /* Make all text in selectbox black */
-            [data-testid="stSidebar"] .stSelectbox div {
-                color: #000000 !important;
-            }
-            
-            /* Style selected value text */
-            [data-testid="stSidebar"] .stSelectbox [data-baseweb="select"] span {
-                color: #000000 !important;
-            }
-            
-            /* Style dropdown options */
-            [data-testid="stSidebar"] [role="option"] {
-                color: #000000 !important;
-                background-color: rgba(255,255,255,0.95) !important;
-            }
-            
-            /* Ensure input text is black */
-            [data-testid="stSidebar"] input {
-                color: #000000 !important;
-            }
-        </style>
-        """, unsafe_allow_html=True)
+        inject_stylesheets("profile_sidebar.css")
         
         # Player selection
         selected_player = st.selectbox("Player 1:", [""] + players, key="player1_select")
@@ -533,167 +490,42 @@ def render_player_profile(all_fixtures, all_tables, players):
         )
     
     if selected_player:
-        player_stats = get_player_stats(selected_player, all_tables, all_fixtures)
+        def get_stats(player):
+            return get_player_stats(player, all_tables, all_fixtures)
         
         # H2H Comparison section
         if compare_player:
-            compare_stats = get_player_stats(compare_player, all_tables, all_fixtures)
-            
             st.markdown(f"<h4 style='text-align:center; color:#050505; text-shadow: 2px 2px 4px rgba(0,0,0,0.5); font-size: 1.5rem; margin-bottom: 2rem;'>{selected_player.title()} vs {compare_player.title()}</h4>", unsafe_allow_html=True)
             
             col1, col2, col3 = st.columns(3)
+            matches, w1, d, l1 = get_h2h(all_fixtures, selected_player, compare_player)
             
             # Enhanced Player 1 stats card
             with col1:
-                career1 = player_stats['career_totals']
-                win_rate1 = round((career1['W'] / career1['MP']) * 100, 1) if career1['MP'] > 0 else 0
-                win_color1 = "#28a745" if win_rate1 >= 50 else "#ffc107" if win_rate1 >= 30 else "#dc3545"
-                st.markdown(f"""
-                <div class="card" style="background: linear-gradient(145deg, #ffffff 0%, #f1f3f4 100%); border-left: 5px solid #667eea;">
-                    <h3 style="color: #667eea; margin-bottom: 1.5rem; font-size: 1.4rem;">{selected_player.title()}</h3>
-                    <div style="background: {win_color1}; color: white; padding: 0.8rem; border-radius: 8px; text-align: center; margin-bottom: 1rem;">
-                        <div style="font-size: 1.8rem; font-weight: bold;">{win_rate1}%</div>
-                        <div style="font-size: 0.9rem;">Win Percentage</div>
-                    </div>
-                    <div style="display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 0.8rem; margin-bottom: 1rem; text-align: center;">
-                        <div><strong style="color: #28a745; font-size: 1.1rem;">W:</strong> <span style="color: #000000; font-size: 1.3rem;">{career1['W']}</span></div>
-                        <div><strong style="color: #ffc107; font-size: 1.1rem;">D:</strong> <span style="color: #000000; font-size: 1.3rem;">{career1['D']}</span></div>
-                        <div><strong style="color: #dc3545; font-size: 1.1rem;">L:</strong> <span style="color: #000000; font-size: 1.3rem;">{career1['L']}</span></div>
-                    </div>
-                    <div style="display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 0.8rem; margin-bottom: 1.5rem; text-align: center;">
-                        <div><strong style="color: #000000; font-size: 1.1rem;">GF:</strong> <span style="color: #000000; font-size: 1.3rem;">{career1['GF']}</span></div>
-                        <div><strong style="color: #000000; font-size: 1.1rem;">GA:</strong> <span style="color: #000000; font-size: 1.3rem;">{career1['GA']}</span></div>
-                        <div><strong style="color: #000000; font-size: 1.1rem;">GD:</strong> <span style="color: #000000; font-size: 1.3rem;">{career1['GD']:+d}</span></div>
-                    </div>
-                    <div style="text-align: center; margin-bottom: 1rem;"><strong style="color: #667eea; font-size: 0.9rem;">Seasons Played:</strong> <span style="color: #000000; font-size: 1rem;">{len(player_stats['seasons'])}</span></div>
-                    <div style="border-top: 2px solid #e9ecef; padding-top: 1rem;">
-                        <div style="margin-bottom: 0.5rem;"><strong style="color: #667eea;">Best Season:</strong> <span style="color: #000000;">{player_stats['best_season']['season']} ({player_stats['best_season']['division']} - Pos: {player_stats['best_season']['position']})</span></div>
-                        <div style="margin-bottom: 0.5rem;"><strong style="color: #667eea;">Biggest Win:</strong> <span style="color: #000000;">{player_stats['highest_win']['score'] if player_stats['highest_win']['score'] != '0-0' else 'None'}{f" vs {player_stats['highest_win']['opponent'].title()}" if player_stats['highest_win']['score'] != '0-0' and player_stats['highest_win']['opponent'] else ''}</span></div>
-                        <div><strong style="color: #667eea;">Biggest Loss:</strong> <span style="color: #000000;">{player_stats['highest_defeat']['score'] if player_stats['highest_defeat']['score'] != '0-0' else 'None'}{f" vs {player_stats['highest_defeat']['opponent'].title()}" if player_stats['highest_defeat']['score'] != '0-0' and player_stats['highest_defeat']['opponent'] else ''}</span></div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+                render_player_card(selected_player, get_stats, "#667eea", cache_key)
             
             # Enhanced Head-to-Head section in the middle
             with col2:
-                compare_stats = get_player_stats(compare_player, all_tables, all_fixtures)
-                matches, w1, d, l1 = get_h2h(all_fixtures, selected_player, compare_player)
-                
-                if matches:
-                    st.markdown(f"""
-                    <div class="card" style="background: linear-gradient(145deg, #ffffff 0%, #f1f3f4 100%); border-left: 5px solid #6c757d; height: 100%;">
-                        <h3 style="color: #6c757d; margin-bottom: 1.5rem; font-size: 1.4rem;">Head-to-Head</h3>
-                        <div style="display: flex; flex-direction: column; gap: 1rem; margin-bottom: 1.5rem; text-align: center;">
-                            <div style="background: linear-gradient(145deg, #28a745 0%, #20c997 100%); color: white; padding: 0.8rem; border-radius: 8px;">
-                                <div style="font-size: 1.8rem; font-weight: bold;">{w1}</div>
-                                <div style="font-size: 0.9rem;">{selected_player.title()} Wins</div>
-                            </div>
-                            <div style="background: linear-gradient(145deg, #ffc107 0%, #ffdd57 100%); color: white; padding: 0.8rem; border-radius: 8px;">
-                                <div style="font-size: 1.8rem; font-weight: bold;">{d}</div>
-                                <div style="font-size: 0.9rem;">Draws</div>
-                            </div>
-                            <div style="background: linear-gradient(145deg, #dc3545 0%, #e74c3c 100%); color: white; padding: 0.8rem; border-radius: 8px;">
-                                <div style="font-size: 1.8rem; font-weight: bold;">{l1}</div>
-                                <div style="font-size: 0.9rem;">{compare_player.title()} Wins</div>
-                            </div>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown("""
-                    <div class="card" style="background: linear-gradient(145deg, #ffffff 0%, #f1f3f4 100%); border-left: 5px solid #6c757d; height: 100%;">
-                        <h3 style="color: #6c757d; margin-bottom: 1.5rem; font-size: 1.4rem;">Head-to-Head</h3>
-                        <div style="text-align: center; color: #000000; font-weight: 500; padding: 2rem 1rem;">
-                            🤝 These players have never faced each other directly.
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                html = render_cached(
+                    "h2h_summary.html",
+                    None if cache_key is None else (selected_player, compare_player) + tuple(cache_key),
+                    lambda: {
+                        'has_matches': bool(matches),
+                        'player1': selected_player.title(),
+                        'player2': compare_player.title(),
+                        'wins': w1, 'draws': d, 'losses': l1,
+                    },
+                )
+                st.markdown(html, unsafe_allow_html=True)
             
             # Enhanced Player 2 stats card
             with col3:
-                career2 = compare_stats['career_totals']
-                win_rate2 = round((career2['W'] / career2['MP']) * 100, 1) if career2['MP'] > 0 else 0
-                win_color2 = "#28a745" if win_rate2 >= 50 else "#ffc107" if win_rate2 >= 30 else "#dc3545"
-                st.markdown(f"""
-                <div class="card" style="background: linear-gradient(145deg, #ffffff 0%, #f1f3f4 100%); border-left: 5px solid #764ba2;">
-                    <h3 style="color: #764ba2; margin-bottom: 1.5rem; font-size: 1.4rem;">{compare_player.title()}</h3>
-                    <div style="background: {win_color2}; color: white; padding: 0.8rem; border-radius: 8px; text-align: center; margin-bottom: 1rem;">
-                        <div style="font-size: 1.8rem; font-weight: bold;">{win_rate2}%</div>
-                        <div style="font-size: 0.9rem;">Win Percentage</div>
-                    </div>
-                    <div style="display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 0.8rem; margin-bottom: 1rem; text-align: center;">
-                        <div><strong style="color: #28a745; font-size: 1.1rem;">W:</strong> <span style="color: #000000; font-size: 1.3rem;">{career2['W']}</span></div>
-                        <div><strong style="color: #ffc107; font-size: 1.1rem;">D:</strong> <span style="color: #000000; font-size: 1.3rem;">{career2['D']}</span></div>
-                        <div><strong style="color: #dc3545; font-size: 1.1rem;">L:</strong> <span style="color: #000000; font-size: 1.3rem;">{career2['L']}</span></div>
-                    </div>
-                    <div style="display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 0.8rem; margin-bottom: 1.5rem; text-align: center;">
-                        <div><strong style="color: #000000; font-size: 1.1rem;">GF:</strong> <span style="color: #000000; font-size: 1.3rem;">{career2['GF']}</span></div>
-                        <div><strong style="color: #000000; font-size: 1.1rem;">GA:</strong> <span style="color: #000000; font-size: 1.3rem;">{career2['GA']}</span></div>
-                        <div><strong style="color: #000000; font-size: 1.1rem;">GD:</strong> <span style="color: #000000; font-size: 1.3rem;">{career2['GD']:+d}</span></div>
-                    </div>
-                    <div style="text-align: center; margin-bottom: 1rem;"><strong style="color: #764ba2; font-size: 0.9rem;">Seasons Played:</strong> <span style="color: #000000; font-size: 1rem;">{len(compare_stats['seasons'])}</span></div>
-                    <div style="border-top: 2px solid #e9ecef; padding-top: 1rem;">
-                        <div style="margin-bottom: 0.5rem;"><strong style="color: #764ba2;">Best Season:</strong> <span style="color: #000000;">{compare_stats['best_season']['season']} ({compare_stats['best_season']['division']} - Pos: {compare_stats['best_season']['position']})</span></div>
-                        <div style="margin-bottom: 0.5rem;"><strong style="color: #764ba2;">Biggest Win:</strong> <span style="color: #000000;">{compare_stats['highest_win']['score'] if compare_stats['highest_win']['score'] != '0-0' else 'None'}{f" vs {compare_stats['highest_win']['opponent'].title()}" if compare_stats['highest_win']['score'] != '0-0' and compare_stats['highest_win']['opponent'] else ''}</span></div>
-                        <div><strong style="color: #764ba2;">Biggest Loss:</strong> <span style="color: #000000;">{compare_stats['highest_defeat']['score'] if compare_stats['highest_defeat']['score'] != '0-0' else 'None'}{f" vs {compare_stats['highest_defeat']['opponent'].title()}" if compare_stats['highest_defeat']['score'] != '0-0' and compare_stats['highest_defeat']['opponent'] else ''}</span></div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+                render_player_card(compare_player, get_stats, "#764ba2", cache_key)
             
             # Display full match history below
             if matches:
                 st.markdown("#### Recent Matches")
-                match_lines = []
-                for season, rnd, home, away, hs, as_ in matches:
-                    hs_text = str(hs) if hs is not None else "-"
-                    as_text = str(as_) if as_ is not None else "-"
-
-                    # Default draw style
-                    score_style = "color:#424242;"  
-                    home_name, away_name = home.title(), away.title()
-
-                    if hs is not None and as_ is not None:
-                        if hs > as_:
-                            score_style = "color:#1b5e20;"  # green
-                            home_name = f"<b>{home.title()}</b>"
-                        elif hs < as_:
-                            score_style = "color:#1b5e20;"  # green
-                            away_name = f"<b>{away.title()}</b>"
-                        else:
-                            score_style = "color:#424242;"  # gray
-
-                    # Get division info
-                    division_label = ""
-                    for f in all_fixtures:
-                        if (f['season'] == season and f['home'] == home and f['away'] == away and 
-                            (f['home_leg1'] == hs or f['home_leg2'] == hs)):
-                            if f['division'] == 'Div1_Fixtures':
-                                division_label = "Division 1"
-                            elif f['division'] == 'Div2_Fixtures':
-                                division_label = "Division 2"
-                            elif f['division'] == 'Cup':
-                                division_label = "Cup"
-                            break
-
-                    # Compose match label
-                    if rnd:
-                        match_label = f"{season} {division_label} {rnd} :"
-                    else:
-                        match_label = f"{season} {division_label} :"
-                    match_label = match_label.replace('  ', ' ').strip()
-
-                    match_lines.append(
-                        f"{match_label} {home_name} "
-                        f"<span style='{score_style}'>{hs_text}-{as_text}</span> {away_name}"
-                    )
-
-                match_text = "<br>".join(match_lines)
-
-                st.markdown(f"""
-                <div class="card" style="background:#f1f5f9; text-align:center;">
-                    <span style="font-size:18px; color:#000000;">{match_text}</span>
-                </div>
-                """, unsafe_allow_html=True)
+                render_match_history(selected_player, compare_player, matches, all_fixtures, cache_key)
     
     else:
         st.markdown("""
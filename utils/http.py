@@ -0,0 +1,65 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.config import get_setting
+
+# Process-wide HTTP sessions for outbound calls (GitHub, OpenRouter). Each
+# upstream gets one keep-alive session with a bounded connection pool, so a
+# roast reuses an open TLS connection instead of handshaking again.
+# mount_pool() gives other sessions (the Sheets client's) the same pool.
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def _adapter(max_retries, hosts):
+    return HTTPAdapter(
+        pool_connections=hosts,
+        pool_maxsize=int(get_setting("http", "pool_size", 10)),
+        # Wait for a free connection instead of opening more than pool_size to one host
+        pool_block=True,
+        max_retries=max_retries,
+    )
+
+
+def mount_pool(session, max_retries=0, hosts=1):
+    """Give session a bounded keep-alive pool per host, sized by [http] pool_size"""
+    adapter = _adapter(max_retries, hosts)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _make_session(name):
+    retries = Retry(
+        total=int(get_setting(name, "retries", 2)),
+        backoff_factor=float(get_setting("http", "backoff_factor", 0.3)),
+        status_forcelist=(500, 502, 503, 504),
+        # Only idempotent methods are retried; a POST that reached the server is not replayed
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    return mount_pool(requests.Session(), retries)
+
+
+def get_session(name):
+    """The shared session for one upstream ("github", "openrouter"), created on first use"""
+    session = _sessions.get(name)
+    if session is None:
+        with _lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = _sessions[name] = _make_session(name)
+    return session
+
+
+def get_timeout(name, read_default):
+    """(connect, read) timeout for an upstream, from its secrets section"""
+    return (
+        float(get_setting(name, "connect_timeout", 3.05)),
+        float(get_setting(name, "timeout", read_default)),
+    )
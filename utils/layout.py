@@ -1,4 +1,10 @@
+import functools
 import streamlit as st
+from functools import lru_cache
+from utils.config import get_setting
+from utils.fragments import load_stylesheet
+from utils.metrics import RERUN_DURATION
+from utils.tracing import current_trace, finish_trace, format_span_tree, get_phase_percentiles, span, start_trace
 
 def set_page_config():
     st.set_page_config(page_title="H2H", layout="wide", page_icon="⚽")
@@ -94,6 +100,14 @@ def inject_css():
         </style>
     """, unsafe_allow_html=True)
 
+@lru_cache(maxsize=None)
+def _style_block(names):
+    return "<style>\n" + "\n".join(load_stylesheet(name) for name in names) + "</style>"
+
+def inject_stylesheets(*names):
+    """Inject CSS files from utils/templates/css as a single <style> block"""
+    st.markdown(_style_block(names), unsafe_allow_html=True)
+
 def show_header(title):
     st.markdown(f"<h1 style='text-align:center; color:#000000;'>{title}</h1>", unsafe_allow_html=True)
 
@@ -137,3 +151,38 @@ def render_combined_league_record(tables_filtered, players):
                     Points: {totals['Points']}
                 </div>
             """, unsafe_allow_html=True)
+
+def perf_panel_enabled():
+    """The performance panel is opt-in: ?perf=1 in the URL or [perf] panel = true in secrets"""
+    return st.query_params.get("perf") in ("1", "true") or bool(get_setting("perf", "panel", False))
+
+def render_perf_panel(root):
+    if root is None or not perf_panel_enabled():
+        return
+    with st.sidebar.expander("⏱ Performance", expanded=False):
+        st.markdown("**This rerun**")
+        st.code(format_span_tree(root), language=None)
+        st.markdown("**Rolling per phase**")
+        st.dataframe(
+            [{"phase": name, "n": p["count"], "p50 ms": round(p["p50_ms"], 1), "p95 ms": round(p["p95_ms"], 1)}
+             for name, p in get_phase_percentiles().items()],
+            hide_index=True,
+            width="stretch",
+        )
+
+def traced_fragment(page, name, **fragment_kwargs):
+    """st.fragment that shows up as a span in a full rerun, and as its own rerun when it reruns alone"""
+    def decorator(func):
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            if current_trace() is not None:
+                with span(f"fragment.{name}"):
+                    return func(*args, **kwargs)
+            start_trace(f"{page}:{name}")
+            try:
+                return func(*args, **kwargs)
+            finally:
+                trace = finish_trace()
+                RERUN_DURATION.observe(trace.wall_ms / 1000, page=f"{page}:{name}")
+        return st.fragment(body, **fragment_kwargs)
+    return decorator
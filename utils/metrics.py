@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.config import get_setting
+
+# Process-wide counters and histograms, exposed in the Prometheus text format
+# either on a local HTTP endpoint ([metrics] port) or as a periodically
+# rewritten textfile for node_exporter ([metrics] textfile).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_REGISTRY = []
+_exporter_lock = threading.Lock()
+_exporter_started = False
+_local = threading.local()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """Snapshot of {label values: value}; a histogram's value is (bucket counts, sum, count)"""
+        with self._lock:
+            return dict(self._values)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def collect(self):
+        lines = self._header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(zip(self.labelnames, key))} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            counts = [c + (1 if value <= bound else 0) for c, bound in zip(counts, self.buckets)]
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self):
+        lines = self._header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, (counts, total, count) in items:
+            pairs = list(zip(self.labelnames, key))
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', bound)])} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {count}")
+        return lines
+
+
+SHEETS_API_CALLS = Counter(
+    "h2h_sheets_api_calls_total", "Google Sheets API calls by worksheet and method", ("worksheet", "method"))
+SHEETS_QUOTA_ERRORS = Counter(
+    "h2h_sheets_quota_errors_total", "Google Sheets calls rejected with HTTP 429", ("worksheet",))
+SHEETS_RETRIES = Counter(
+    "h2h_sheets_retries_total", "Google Sheets calls retried after a transient error", ("worksheet", "reason"))
+CACHE_REQUESTS = Counter(
+    "h2h_cache_requests_total", "Cache lookups by cache layer and result", ("cache", "name", "result"))
+OPENROUTER_LATENCY = Histogram(
+    "h2h_openrouter_request_duration_seconds", "OpenRouter chat completion latency", ("outcome",))
+OPENROUTER_FIRST_TOKEN = Histogram(
+    "h2h_openrouter_first_token_seconds", "Time to the first streamed roast token")
+OPENROUTER_FAILURES = Counter(
+    "h2h_openrouter_failures_total", "Failed OpenRouter roast requests", ("reason",))
+ROAST_REJECTIONS = Counter(
+    "h2h_roast_rejected_total", "Roasts turned away by the roast executor", ("reason",))
+SEED_CLAIMS = Counter(
+    "h2h_seed_claims_total", "Seed claims by outcome (ok, conflict, error)", ("result",))
+SEED_CLAIM_WRITES = Counter(
+    "h2h_seed_claim_writes_total", "Seed claim rows journaled for the seed sheet", ("result",))
+SHEETS_WRITE_BATCH = Histogram(
+    "h2h_sheets_write_batch_rows", "Rows per append_rows batch from the Sheets write queue", ("queue", "result"),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+SHEETS_DEAD_LETTERS = Counter(
+    "h2h_sheets_dead_letter_rows_total", "Queued Sheets rows set aside after Sheets rejected them",
+    ("queue", "reason"))
+RERUN_DURATION = Histogram(
+    "h2h_script_rerun_duration_seconds", "Streamlit script rerun duration", ("page",))
+
+
+def is_quota_error(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+@contextmanager
+def sheets_call(worksheet, method):
+    """Count a Sheets API call, and its quota error if it fails with a 429"""
+    SHEETS_API_CALLS.inc(worksheet=worksheet, method=method)
+    try:
+        yield
+    except Exception as e:
+        if is_quota_error(e):
+            SHEETS_QUOTA_ERRORS.inc(worksheet=worksheet)
+        raise
+
+
+def mark_cache_miss():
+    """Call from inside an @st.cache_data function body: it only runs on a miss"""
+    _local.cache_miss = True
+
+
+def cached_call(name, func, *args, **kwargs):
+    """Call an @st.cache_data function and count whether Streamlit served it from cache"""
+    _local.cache_miss = False
+    result = func(*args, **kwargs)
+    CACHE_REQUESTS.inc(cache="st_cache_data", name=name, result="miss" if _local.cache_miss else "hit")
+    return result
+
+
+def render_prometheus():
+    lines = []
+    for metric in list(_REGISTRY):
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_textfile(path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+
+
+def _textfile_loop(path, interval):
+    while True:
+        try:
+            write_textfile(path)
+        except OSError as e:
+            print(f"Could not write metrics textfile '{path}': {e}")
+        time.sleep(interval)
+
+
+def start_exporter():
+    """Start the configured exporters once per process; safe to call on every rerun"""
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+        port = get_setting("metrics", "port")
+        if port:
+            host = get_setting("metrics", "host", "127.0.0.1")
+            try:
+                server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as e:
+                # Another app process already serves this port
+                print(f"Could not start metrics endpoint on {host}:{port}: {e}")
+            else:
+                threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        textfile = get_setting("metrics", "textfile")
+        if textfile:
+            interval = float(get_setting("metrics", "textfile_interval", 15))
+            threading.Thread(
+                target=_textfile_loop, args=(textfile, interval), name="metrics-textfile", daemon=True
+            ).start()
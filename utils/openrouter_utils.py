@@ -1,22 +1,58 @@
 import streamlit as st
 import requests
+import json
 import os
+import threading
+import time
+from utils.config import get_setting
+from utils import roast_cache
+from utils.roast_executor import RoastBusyError, get_executor
+from utils.http import get_session, get_timeout
+from utils.metrics import CACHE_REQUESTS, OPENROUTER_FAILURES, OPENROUTER_FIRST_TOKEN, OPENROUTER_LATENCY
 
-def fetch_gist_content(gist_url):
+# Parsed prompt config per gist URL: {"config", "etag", "fetched_at"}. Entries
+# younger than [github] prompt_ttl are served as is; older ones are revalidated
+# with If-None-Match, and kept as a fallback if GitHub is slow or down.
+_prompt_cache = {}
+_prompt_cache_lock = threading.Lock()
+_prompt_refresh_lock = threading.Lock()
+
+
+def _gist_api_url(gist_url):
     # Convert gist page URL to API URL
     gist_id = gist_url.rstrip('/').split('/')[-1]
-    api_url = f"https://api.github.com/gists/{gist_id}"
-    response = requests.get(api_url)
+    api_url = get_setting("github", "api_url", "https://api.github.com").rstrip('/')
+    return f"{api_url}/gists/{gist_id}"
+
+
+def _github_headers(etag=None):
+    headers = {"Accept": "application/vnd.github+json"}
+    token = get_setting("github", "token")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    if etag:
+        headers["If-None-Match"] = etag
+    return headers
+
+
+def fetch_gist(gist_url, etag=None):
+    """Fetch a gist's first file; returns (content, etag), or (None, etag) if unchanged since etag"""
+    response = get_session("github").get(
+        _gist_api_url(gist_url), headers=_github_headers(etag), timeout=get_timeout("github", 5))
+    if response.status_code == 304:
+        return None, etag
     response.raise_for_status()
     gist_files = response.json()["files"]
     # Get the first file's content
     file_content = next(iter(gist_files.values()))["content"]
-    return file_content
+    return file_content, response.headers.get("ETag")
 
 
-def load_prompts_from_gist():
-    gist_url = st.secrets["github"]["gist_url"]
-    content = fetch_gist_content(gist_url)
+def fetch_gist_content(gist_url):
+    return fetch_gist(gist_url)[0]
+
+
+def parse_prompts(content):
     # Parse markdown for system_message, user_template, ai_settings
     system_message, user_template, ai_settings = [], [], {}
     mode = None
@@ -46,27 +82,63 @@ def load_prompts_from_gist():
     }
 
 
-def roast_player_with_openrouter(player_name, player_stats, api_key=None):
-    """
-    Calls OpenRouter's AI model to roast a player based on their stats.
-    Args:
-        player_name (str): The player's name (can be a placeholder for anonymity).
-        player_stats (str): A string summary of the player's stats.
-        api_key (str, optional): OpenRouter API key. If None, will use st.secrets if available, then env var.
-    Returns:
-        str: The AI-generated roast, or an error message.
-    """
+def load_prompts_from_gist():
+    """Prompt config from the gist, cached for [github] prompt_ttl seconds and revalidated by ETag"""
+    gist_url = st.secrets["github"]["gist_url"]
+    ttl = float(get_setting("github", "prompt_ttl", 300))
+    with _prompt_cache_lock:
+        entry = _prompt_cache.get(gist_url)
+    if entry and time.time() - entry["fetched_at"] < ttl:
+        CACHE_REQUESTS.inc(cache="prompt", name="gist", result="hit")
+        return entry["config"]
+    # One session revalidates; the others keep using the cached config meanwhile
+    if not _prompt_refresh_lock.acquire(blocking=entry is None):
+        CACHE_REQUESTS.inc(cache="prompt", name="gist", result="stale")
+        return entry["config"]
+    try:
+        with _prompt_cache_lock:
+            entry = _prompt_cache.get(gist_url)
+        if entry and time.time() - entry["fetched_at"] < ttl:
+            # Another session refreshed it while we waited
+            CACHE_REQUESTS.inc(cache="prompt", name="gist", result="hit")
+            return entry["config"]
+        try:
+            content, etag = fetch_gist(gist_url, entry["etag"] if entry else None)
+        except (requests.RequestException, KeyError, StopIteration) as e:
+            if entry is None:
+                raise
+            print(f"Couldn't refresh roast prompts from GitHub ({e}), using the cached copy")
+            CACHE_REQUESTS.inc(cache="prompt", name="gist", result="stale")
+            # Keep serving it for another TTL rather than retrying on every roast
+            with _prompt_cache_lock:
+                _prompt_cache[gist_url] = dict(entry, fetched_at=time.time())
+            return entry["config"]
+        if content is None:
+            CACHE_REQUESTS.inc(cache="prompt", name="gist", result="revalidated")
+            config = entry["config"]
+        else:
+            CACHE_REQUESTS.inc(cache="prompt", name="gist", result="miss")
+            config = parse_prompts(content)
+        with _prompt_cache_lock:
+            _prompt_cache[gist_url] = {"config": config, "etag": etag, "fetched_at": time.time()}
+        return config
+    finally:
+        _prompt_refresh_lock.release()
+
+
+def _resolve_api_key(api_key):
     if api_key is None:
         try:
             api_key = st.secrets["openrouter"]["api_key"]
         except Exception:
             api_key = os.getenv("OPENROUTER_API_KEY")
-    if not api_key:
-        return "[OpenRouter API key not set]"
+    return api_key
 
-    prompts_config = load_prompts_from_gist()
+
+def _completion_request(api_key, player_stats, prompts_config, stream=False):
     ai_settings = prompts_config["ai_settings"]
-    url = "https://openrouter.ai/api/v1/chat/completions"
+    base_url = get_setting("openrouter", "base_url", "https://openrouter.ai/api/v1").rstrip('/')
+    url = f"{base_url}/chat/completions"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
@@ -80,12 +152,119 @@ def roast_player_with_openrouter(player_name, player_stats, api_key=None):
         "max_tokens": int(ai_settings["max_tokens"]),
         "temperature": float(ai_settings["temperature"])
     }
+    if stream:
+        data["stream"] = True
+    return url, headers, data
+
+
+def _iter_sse_content(response):
+    """Content deltas from an OpenRouter server-sent event stream"""
+    response.encoding = "utf-8"
+    for line in response.iter_lines(decode_unicode=True):
+        # Blank lines separate events; lines starting with ':' are keep-alive comments
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+        event = json.loads(payload)
+        if "error" in event:
+            raise RuntimeError(event["error"].get("message", event["error"]))
+        content = event["choices"][0].get("delta", {}).get("content")
+        if content:
+            yield content
+
+
+def _stream_completion(api_key, player_stats, prompts_config):
+    start = time.perf_counter()
+    first_token = True
+    try:
+        url, headers, data = _completion_request(api_key, player_stats, prompts_config, stream=True)
+        response = get_session("openrouter").post(
+            url, headers=headers, json=data, timeout=get_timeout("openrouter", 30), stream=True)
+        with response:
+            response.raise_for_status()
+            for content in _iter_sse_content(response):
+                if first_token:
+                    OPENROUTER_FIRST_TOKEN.observe(time.perf_counter() - start)
+                    first_token = False
+                yield content.replace('@', '')
+        OPENROUTER_LATENCY.observe(time.perf_counter() - start, outcome="ok")
+    except Exception as e:
+        OPENROUTER_LATENCY.observe(time.perf_counter() - start, outcome="error")
+        OPENROUTER_FAILURES.inc(reason=type(e).__name__)
+        raise
+
+
+def _complete(api_key, player_stats, prompts_config):
+    url, headers, data = _completion_request(api_key, player_stats, prompts_config)
+    start = time.perf_counter()
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = get_session("openrouter").post(
+            url, headers=headers, json=data, timeout=get_timeout("openrouter", 30))
         response.raise_for_status()
         result = response.json()
         roast_content = result["choices"][0]["message"]["content"]
         roast_content = roast_content.replace('@', '')
-        return roast_content
+        OPENROUTER_LATENCY.observe(time.perf_counter() - start, outcome="ok")
+        yield roast_content
     except Exception as e:
-        return f"[Error contacting OpenRouter: {e}]"
+        OPENROUTER_LATENCY.observe(time.perf_counter() - start, outcome="error")
+        OPENROUTER_FAILURES.inc(reason=type(e).__name__)
+        raise
+
+
+def _errors_as_text(chunks):
+    try:
+        yield from chunks
+    except RoastBusyError as e:
+        yield f"[{e}]"
+    except Exception as e:
+        yield f"[Error contacting OpenRouter: {e}]"
+
+
+def replace_in_stream(chunks, old, new):
+    """Yield chunks with old replaced by new, including occurrences split across chunks"""
+    keep = len(old) - 1
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        *done, tail = pending.split(old)
+        out = "".join(part + new for part in done)
+        # Hold back just enough of the tail to complete an occurrence in the next chunk
+        split_at = max(0, len(tail) - keep)
+        out += tail[:split_at]
+        pending = tail[split_at:]
+        if out:
+            yield out
+    if pending:
+        yield pending
+
+
+def roast_player_with_openrouter(player_name, player_stats, api_key=None, stream=False, reroll=False, session_key=None):
+    """
+    Calls OpenRouter's AI model to roast a player based on their stats.
+    Args:
+        player_name (str): The player's name (can be a placeholder for anonymity).
+        player_stats (str): A string summary of the player's stats.
+        api_key (str, optional): OpenRouter API key. If None, will use st.secrets if available, then env var.
+        stream (bool, optional): If True, return a generator that yields the roast as it is generated.
+        reroll (bool, optional): If True, skip the roast cache and always make a new call.
+        session_key (str, optional): Identifies the caller for the roast executor's per-session rate limit.
+    Returns:
+        str: The AI-generated roast, or an error message (a generator of chunks if stream is True).
+    """
+    api_key = _resolve_api_key(api_key)
+    if not api_key:
+        OPENROUTER_FAILURES.inc(reason="no_api_key")
+        message = "[OpenRouter API key not set]"
+        return iter([message]) if stream else message
+
+    prompts_config = load_prompts_from_gist()
+    producer = _stream_completion if stream else _complete
+    chunks = _errors_as_text(roast_cache.cached_stream(
+        roast_cache.roast_key(player_stats, prompts_config),
+        lambda: get_executor().submit(lambda: producer(api_key, player_stats, prompts_config), session_key),
+        reroll=reroll,
+    ))
+    return chunks if stream else "".join(chunks)
@@ -1,5 +1,13 @@
 import streamlit as st
 
-all_players = st.secrets["all_players"]["all_players"]
-player_codes = st.secrets["player_codes"]
-link_url = st.secrets["links"]["link_url"]
+# Read from st.secrets when called, not at import, so importing this module
+# costs nothing and doesn't fail before secrets are in place
+
+def get_all_players():
+    return st.secrets["all_players"]["all_players"]
+
+def get_player_codes():
+    return st.secrets["player_codes"]
+
+def get_link_url():
+    return st.secrets["links"]["link_url"]
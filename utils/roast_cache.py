@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import threading
+
+from cachetools import LRUCache
+
+from utils.config import get_setting
+from utils.metrics import CACHE_REQUESTS
+
+# Finished roasts keyed by a digest of everything that shapes the completion:
+# the stats summary, both prompts and the AI settings. Roasts are cached with
+# the anonymous placeholder still in them, so nothing on disk names a player.
+# Identical requests that arrive while one is in flight follow its stream
+# instead of making another upstream call.
+
+_cache = LRUCache(maxsize=int(get_setting("roast_cache", "size", 256)))
+_inflight = {}
+_lock = threading.Lock()
+
+
+def roast_key(player_stats, prompts_config):
+    """Digest of the stats summary, system message, user template and AI settings"""
+    payload = json.dumps([
+        player_stats,
+        prompts_config["system_message"],
+        prompts_config["user_template"],
+        sorted(prompts_config["ai_settings"].items()),
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _disk_path(key):
+    path = get_setting("roast_cache", "path")
+    return os.path.join(path, f"{key}.txt") if path else None
+
+
+def get(key):
+    with _lock:
+        roast = _cache.get(key)
+    if roast is not None:
+        return roast
+    path = _disk_path(key)
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            roast = f.read()
+        with _lock:
+            _cache[key] = roast
+    return roast
+
+
+def put(key, roast):
+    with _lock:
+        _cache[key] = roast
+    path = _disk_path(key)
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(roast)
+        os.replace(tmp_path, path)
+
+
+class _Flight:
+    """One upstream roast in progress; followers read its chunks as they arrive"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.followers = 0
+        self.cond = threading.Condition()
+
+    def add(self, chunk):
+        with self.cond:
+            self.chunks.append(chunk)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def follow(self):
+        index = 0
+        while True:
+            with self.cond:
+                while index >= len(self.chunks) and not self.done:
+                    self.cond.wait()
+                new_chunks = self.chunks[index:]
+                finished = self.done
+            index += len(new_chunks)
+            yield from new_chunks
+            if finished and index >= len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+def cached_stream(key, produce, reroll=False):
+    """Yield a roast's chunks from the cache, an identical in-flight request, or produce().
+
+    produce() returns a chunk generator and raises on failure; failed or
+    abandoned roasts are not cached. reroll=True always makes a new call.
+    """
+    if not reroll:
+        roast = get(key)
+        if roast is not None:
+            CACHE_REQUESTS.inc(cache="roast", name="openrouter", result="hit")
+            yield roast
+            return
+    with _lock:
+        flight = None if reroll else _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+        else:
+            flight.followers += 1
+    if not leader:
+        CACHE_REQUESTS.inc(cache="roast", name="openrouter", result="coalesced")
+        yield from flight.follow()
+        return
+
+    CACHE_REQUESTS.inc(cache="roast", name="openrouter", result="bypass" if reroll else "miss")
+    chunks = None
+    error = None
+    completed = False
+    try:
+        chunks = produce()
+        for chunk in chunks:
+            flight.add(chunk)
+            yield chunk
+        completed = True
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        if not completed and error is None and chunks is not None:
+            with _lock:
+                # Check and unpublish together, so nobody joins a flight we're about to cancel
+                followed = flight.followers > 0
+                if not followed and _inflight.get(key) is flight:
+                    del _inflight[key]
+            if followed:
+                # Our session went away mid-roast; finish it for whoever is following
+                try:
+                    for chunk in chunks:
+                        flight.add(chunk)
+                    completed = True
+                except Exception as e:
+                    error = e
+            else:
+                chunks.close()
+        with _lock:
+            if _inflight.get(key) is flight:
+                del _inflight[key]
+        if completed:
+            put(key, "".join(flight.chunks))
+            flight.finish()
+        else:
+            flight.finish(error or RuntimeError("roast was cancelled"))
@@ -0,0 +1,97 @@
+import pandas as pd
+
+from utils.tracing import traced
+
+# Compact, name-free stats summaries for roast prompts, built for every player
+# at once from the shared dataset. Pressing "Roast!" is then a dict lookup, and
+# the same stats always give the same text (so the roast cache can hit).
+
+TABLE_COLUMNS = ["MP", "W", "D", "L", "GF", "GA", "GD", "Points"]
+FORM_LEGS = 10
+RIVAL_MIN_LEGS = 3
+
+
+def _season_lines(dataset):
+    lines = {}
+    for season, df in dataset.tables.items():
+        if df.empty or "Twitter Handles" not in df.columns:
+            continue
+        columns = [c for c in TABLE_COLUMNS if c in df.columns]
+        rows = df.drop_duplicates("Twitter Handles").set_index("Twitter Handles")[columns]
+        for player, values in rows.to_dict("index").items():
+            # Typed table columns hold pd.NA for blank cells; leave those out rather than print "<NA>"
+            stats = ", ".join(f"{col}: {values[col]}" for col in columns if pd.notna(values[col]) and values[col] != "")
+            if stats:
+                lines.setdefault(str(player).strip(), []).append(f"{season}: {stats}")
+    return lines
+
+
+def _player_legs(dataset):
+    """Every played leg twice, once from each player's side, in season order"""
+    columns = ["season", "home", "away", "home_leg1", "away_leg1", "home_leg2", "away_leg2"]
+    df = pd.DataFrame(dataset.fixtures, columns=columns)
+    df["order"] = df["season"].map({s: i for i, s in enumerate(dataset.seasons)})
+    legs = pd.concat([
+        df[["order", "home", "away", "home_leg1", "away_leg1"]].set_axis(["order", "home", "away", "hg", "ag"], axis=1),
+        df[["order", "home", "away", "home_leg2", "away_leg2"]].set_axis(["order", "home", "away", "hg", "ag"], axis=1),
+    ]).dropna(subset=["hg", "ag"])
+    legs = legs.sort_values("order", kind="stable").reset_index(drop=True)
+    sides = pd.concat([
+        pd.DataFrame({"seq": legs.index, "Player": legs["home"], "Opponent": legs["away"], "GF": legs["hg"], "GA": legs["ag"]}),
+        pd.DataFrame({"seq": legs.index, "Player": legs["away"], "Opponent": legs["home"], "GF": legs["ag"], "GA": legs["hg"]}),
+    ]).sort_values("seq", kind="stable")
+    sides[["GF", "GA"]] = sides[["GF", "GA"]].astype(int)
+    sides["Margin"] = sides["GF"] - sides["GA"]
+    sides["Result"] = pd.cut(sides["Margin"], [-1000, -1, 0, 1000], labels=["L", "D", "W"]).astype(str)
+    return sides
+
+
+def _record(meeting):
+    return f"{meeting['W']}W {meeting['D']}D {meeting['L']}L"
+
+
+@traced("roast.build_digests")
+def build_prompt_digests(dataset):
+    """{player: prompt stats text} for every player; never contains any player name"""
+    season_lines = _season_lines(dataset)
+    sides = _player_legs(dataset)
+    performance = dataset.seasonal_performance
+
+    form = sides.groupby("Player")["Result"].agg(lambda r: " ".join(r.iloc[-FORM_LEGS:]))
+    best_win = sides[sides["Margin"] > 0].sort_values("Margin", ascending=False, kind="stable").drop_duplicates("Player")
+    worst_loss = sides[sides["Margin"] < 0].sort_values("Margin", kind="stable").drop_duplicates("Player")
+    best_win = best_win.set_index("Player")
+    worst_loss = worst_loss.set_index("Player")
+    results = pd.get_dummies(sides["Result"]).reindex(columns=["W", "D", "L"], fill_value=0).astype(int)
+    meetings = pd.concat([sides[["Player", "Opponent"]], results], axis=1).groupby(["Player", "Opponent"]).sum()
+    meetings = meetings.assign(legs=meetings.sum(axis=1)).reset_index()
+    rivals = meetings.sort_values(["legs", "Opponent"], ascending=[False, True]).drop_duplicates("Player").set_index("Player")
+    nemeses = meetings[meetings["legs"] >= RIVAL_MIN_LEGS].assign(net=lambda m: m["W"] - m["L"])
+    nemeses = nemeses.sort_values(["net", "Opponent"]).drop_duplicates("Player").set_index("Player")
+    finishes = performance.assign(
+        rank=performance["Division"].map({"Division 1": 0, "Division 2": 1}).fillna(2)
+    ).sort_values(["rank", "Position", "Season"]).drop_duplicates("Player").set_index("Player")
+
+    digests = {}
+    for player in dataset.players:
+        lines = list(season_lines.get(player, []))
+        if player in finishes.index:
+            best = finishes.loc[player]
+            lines.append(f"Best finish: {best['Division']}, position {best['Position']} ({best['Season']})")
+        if player in form.index:
+            lines.append(f"Form (last {FORM_LEGS} legs, oldest first): {form[player]}")
+        records = []
+        if player in best_win.index:
+            records.append(f"biggest win {best_win.loc[player, 'GF']}-{best_win.loc[player, 'GA']}")
+        if player in worst_loss.index:
+            records.append(f"heaviest defeat {worst_loss.loc[player, 'GF']}-{worst_loss.loc[player, 'GA']}")
+        if records:
+            lines.append("Records: " + ", ".join(records))
+        if player in rivals.index:
+            rival = rivals.loc[player]
+            lines.append(f"Most-played opponent: {rival['legs']} legs, {_record(rival)}")
+        if player in nemeses.index and nemeses.loc[player, "net"] < 0:
+            nemesis = nemeses.loc[player]
+            lines.append(f"Toughest rival: {_record(nemesis)} in {nemesis['legs']} legs")
+        digests[player] = "\n".join(lines) if lines else "No stats found."
+    return digests
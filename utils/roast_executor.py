@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+from collections import deque
+
+from utils.config import get_setting
+from utils.metrics import ROAST_REJECTIONS
+
+# Upstream roast calls run on a small pool of worker threads instead of the
+# Streamlit script thread. At most [roast_executor] workers calls are in
+# flight, at most queue_size more wait, and anything beyond that is turned
+# away immediately with RoastBusyError rather than tying up the server.
+
+
+class RoastBusyError(Exception):
+    """The roast queue is full, or this session is roasting too often"""
+
+
+class RoastRateLimitedError(RoastBusyError):
+    pass
+
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+class _Job:
+    def __init__(self, factory):
+        self.factory = factory
+        self.out = queue.Queue()
+        self.cancelled = threading.Event()
+
+
+class RoastExecutor:
+    def __init__(self, workers, queue_size, per_minute):
+        self.workers = workers
+        self.per_minute = per_minute
+        self._jobs = queue.Queue(maxsize=queue_size)
+        self._recent = {}
+        self._swept_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"roast-worker-{i}", daemon=True).start()
+
+    def _check_rate(self, session_key):
+        if session_key is None or not self.per_minute:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._swept_at > 60:
+                # Session keys are per browser session; forget the ones that went quiet
+                stale = [key for key, recent in self._recent.items() if not recent or now - recent[-1] > 60]
+                for key in stale:
+                    del self._recent[key]
+                self._swept_at = now
+            recent = self._recent.setdefault(session_key, deque())
+            while recent and now - recent[0] > 60:
+                recent.popleft()
+            if len(recent) >= self.per_minute:
+                wait = int(60 - (now - recent[0])) + 1
+                ROAST_REJECTIONS.inc(reason="rate_limited")
+                raise RoastRateLimitedError(f"Easy there! Try another roast in {wait}s.")
+            recent.append(now)
+
+    def _release_rate(self, session_key):
+        # A roast that never ran doesn't count against the session
+        if session_key is None or not self.per_minute:
+            return
+        with self._lock:
+            recent = self._recent.get(session_key)
+            if recent:
+                recent.pop()
+            if not recent:
+                self._recent.pop(session_key, None)
+
+    def submit(self, factory, session_key=None):
+        """Queue factory() (a chunk generator) and return a generator of its chunks.
+
+        Raises RoastBusyError straight away if the queue is full or the session
+        is over its per-minute limit. Closing the returned generator cancels the job.
+        """
+        self._check_rate(session_key)
+        self._start()
+        job = _Job(factory)
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            self._release_rate(session_key)
+            ROAST_REJECTIONS.inc(reason="busy")
+            raise RoastBusyError("Lots of roasting going on right now, please try again in a moment.")
+        return self._results(job)
+
+    def _results(self, job):
+        try:
+            while True:
+                item = job.out.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            # Also reached when the session navigates away mid-roast
+            job.cancelled.set()
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job.cancelled.is_set():
+                continue
+            chunks = None
+            try:
+                chunks = job.factory()
+                for chunk in chunks:
+                    if job.cancelled.is_set():
+                        break
+                    job.out.put(chunk)
+                job.out.put(_DONE)
+            except Exception as e:
+                job.out.put(_Failure(e))
+            finally:
+                if chunks is not None:
+                    chunks.close()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """The process-wide roast executor, configured from [roast_executor]"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = RoastExecutor(
+                workers=int(get_setting("roast_executor", "workers", 4)),
+                queue_size=int(get_setting("roast_executor", "queue_size", 8)),
+                per_minute=int(get_setting("roast_executor", "per_minute", 6)),
+            )
+    return _executor
@@ -0,0 +1,214 @@
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+
+from .config import get_setting
+from .metrics import SEED_CLAIMS
+from .sheet import SeedConflictError, append_assignment, load_assignments, pending_assignments
+from .sheets_io import SheetsUnavailableError
+
+# Seed claims go through a local SQLite ledger before they reach the sheet.
+# The ledger's UNIQUE constraints make "is this seed still free?" and "take
+# it" one atomic step, across threads and across server processes sharing
+# the same file, so two players clicking the same tile can't both get it.
+#
+#   reserve (ledger) -> journal in the write queue -> confirmed, or release on failure
+#   ... the queue appends it to the sheet -> synced once a claim sees it there
+#
+# The sheet stays authoritative: its rows are copied into the ledger before
+# each claim, and synced claims that have since disappeared from the sheet
+# (a new draw was started) are dropped. Confirmed claims are never dropped
+# before they have reached the sheet.
+#
+# The ledger also holds each draw's random seed and commitment nonce, so every
+# process sharing it lays out the same tiles.
+
+DEFAULT_LEDGER = os.path.join("cache", "seed_claims.sqlite3")
+
+_lock = threading.Lock()
+_ready = set()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    player TEXT PRIMARY KEY,
+    seed TEXT NOT NULL UNIQUE,
+    claimed_at TEXT,
+    reserved_at REAL NOT NULL,
+    confirmed_at REAL,
+    synced_at REAL
+)
+"""
+
+_DRAW_SCHEMA = """
+CREATE TABLE IF NOT EXISTS draws (
+    draw_id TEXT PRIMARY KEY,
+    seed TEXT NOT NULL,
+    nonce TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+def _ledger_path():
+    return get_setting("seed_claims", "ledger", DEFAULT_LEDGER)
+
+
+def _connect():
+    path = _ledger_path()
+    if path not in _ready and os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+    conn = sqlite3.connect(path, timeout=float(get_setting("seed_claims", "lock_timeout", 10)), isolation_level=None)
+    if path not in _ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(_SCHEMA)
+        conn.execute(_DRAW_SCHEMA)
+        try:
+            # Ledgers created before claims went through the write queue
+            conn.execute("ALTER TABLE claims ADD COLUMN confirmed_at REAL")
+        except sqlite3.OperationalError:
+            pass
+        _ready.add(path)
+    return conn
+
+
+def _reconcile(conn, assignments, queued):
+    """Bring the ledger in line with the sheet's assignments (inside a write transaction)
+
+    queued holds this process's claims that are journaled but not yet in the sheet.
+    """
+    now = time.time()
+    # A reservation whose process died before journaling the row frees its seed again
+    pending_timeout = float(get_setting("seed_claims", "pending_timeout", 120))
+    conn.execute("DELETE FROM claims WHERE confirmed_at IS NULL AND synced_at IS NULL AND reserved_at < ?",
+                 (now - pending_timeout,))
+    unsynced = conn.execute("SELECT player FROM claims WHERE synced_at IS NULL AND confirmed_at IS NOT NULL").fetchall()
+    conn.executemany(
+        "UPDATE claims SET synced_at = ? WHERE player = ?",
+        [(now, player) for (player,) in unsynced if player in assignments and player not in queued],
+    )
+    # Synced rows missing from the sheet for longer than any reader's cache was cleared from the sheet
+    prune_after = float(get_setting("seed_claims", "prune_after", 60))
+    synced = conn.execute("SELECT player FROM claims WHERE synced_at < ?", (now - prune_after,)).fetchall()
+    gone = [(player,) for (player,) in synced if player not in assignments]
+    conn.executemany("DELETE FROM claims WHERE player = ?", gone)
+    conn.executemany(
+        "INSERT OR IGNORE INTO claims (player, seed, reserved_at, confirmed_at, synced_at) VALUES (?, ?, ?, ?, ?)",
+        [(str(player), str(seed), now, now, now) for player, seed in assignments.items() if player not in queued],
+    )
+
+
+def _conflict_message(conn, player, seed):
+    row = conn.execute("SELECT seed FROM claims WHERE player = ?", (player,)).fetchone()
+    if row:
+        return f"You have already been seeded to **{row[0]}**."
+    return f"❌ {seed} was just taken by another player, please pick another."
+
+
+def _reserve(player, seed, timestamp, assignments, queued):
+    with _lock:
+        conn = _connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                _reconcile(conn, assignments, queued)
+                conn.execute(
+                    "INSERT INTO claims (player, seed, claimed_at, reserved_at) VALUES (?, ?, ?, ?)",
+                    (player, seed, timestamp, time.time()),
+                )
+            except sqlite3.IntegrityError:
+                message = _conflict_message(conn, player, seed)
+                conn.execute("COMMIT")
+                raise SeedConflictError(message)
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+
+def _finish(player, seed, confirmed):
+    with _lock:
+        conn = _connect()
+        try:
+            if confirmed:
+                conn.execute("UPDATE claims SET confirmed_at = ? WHERE player = ? AND seed = ?", (time.time(), player, seed))
+            else:
+                conn.execute("DELETE FROM claims WHERE player = ? AND seed = ? AND confirmed_at IS NULL", (player, seed))
+        finally:
+            conn.close()
+
+
+def claimed_seeds():
+    """{player: seed} for every claim in the ledger, including ones still being written"""
+    with _lock:
+        conn = _connect()
+        try:
+            return dict(conn.execute("SELECT player, seed FROM claims").fetchall())
+        finally:
+            conn.close()
+
+
+def draw_secrets(draw_id):
+    """(seed, nonce) for one draw, created on first use and the same for every process after that"""
+    with _lock:
+        conn = _connect()
+        try:
+            # The first process to get here wins; the others read its values
+            conn.execute(
+                "INSERT OR IGNORE INTO draws (draw_id, seed, nonce, created_at) VALUES (?, ?, ?, ?)",
+                (draw_id, str(random.SystemRandom().randrange(2 ** 63)), secrets.token_hex(16), time.time()),
+            )
+            seed, nonce = conn.execute("SELECT seed, nonce FROM draws WHERE draw_id = ?", (draw_id,)).fetchone()
+        finally:
+            conn.close()
+    return int(seed), nonce
+
+
+def load_claims():
+    """Sheet assignments plus claims other sessions and processes have reserved; (assignments, error)"""
+    assignments, error = load_assignments()
+    if error:
+        return assignments, error
+    claimed = claimed_seeds()
+    taken = set(assignments.values())
+    # The sheet wins where the two disagree
+    for player, seed in claimed.items():
+        if player not in assignments and seed not in taken:
+            assignments[player] = seed
+            taken.add(seed)
+    return assignments, None
+
+
+def claim_seed(player, seed, timestamp):
+    """Atomically claim seed for player and queue it for the sheet.
+
+    Returns once the claim is journaled (durable), with the write queue Ticket.
+    Raises SeedConflictError (with a message for the player) if the seed or the
+    player is already taken; if the row couldn't be journaled the seed is
+    released again and the error is raised.
+    """
+    assignments, error = load_assignments()
+    if error:
+        # Without the sheet's view we can't validate the claim
+        SEED_CLAIMS.inc(result="error")
+        raise SheetsUnavailableError(error, "unavailable")
+    queued = pending_assignments()
+    try:
+        _reserve(player, seed, timestamp, assignments, queued)
+    except SeedConflictError:
+        SEED_CLAIMS.inc(result="conflict")
+        raise
+    try:
+        ticket = append_assignment(player, seed, timestamp)
+    except Exception:
+        _finish(player, seed, confirmed=False)
+        SEED_CLAIMS.inc(result="error")
+        raise
+    _finish(player, seed, confirmed=True)
+    SEED_CLAIMS.inc(result="ok")
+    return ticket
@@ -1,18 +0,0 @@
-import random
-
-def get_shuffled_seeds():
-    def excel_cols(n):
-        result = []
-        for i in range(n):
-            s = ""
-            i += 1
-            while i:
-                i, r = divmod(i - 1, 26)
-                s = chr(65 + r) + s
-            result.append(s)
-        return result
-
-    cols = excel_cols(16)  # A through P
-    seeds = [f"{col}{j}" for col in cols for j in (1, 2)]
-    random.shuffle(seeds)
-    return seeds
\ No newline at end of file
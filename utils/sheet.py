@@ -1,13 +1,96 @@
-from .google_sheets import get_worksheet
+import threading
+import time
 
-def load_assignments():
+from .config import get_setting
+from .google_sheets import get_worksheet, invalidate_worksheet, SEED_WORKSHEET
+from .metrics import CACHE_REQUESTS, SEED_CLAIM_WRITES
+from . import sheets_io
+from .sheets_io import SheetsUnavailableError
+from .write_queue import get_write_queue
+
+SHEETS_BUSY_MESSAGE = "❌ Google Sheets is busy right now, please try again in a moment."
+
+# Seed assignments shared by every session in the process. Reads within
+# [seed_sheet] assignments_ttl seconds are served from memory, successful
+# claims are written through, and only one session at a time re-reads the
+# sheet when the copy is due for reconciliation.
+_assignments = {"data": None, "fetched_at": 0.0}
+_assignments_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+class SeedConflictError(Exception):
+    """The seed or player was already claimed, as far as this process knows"""
+
+def _seed_queue():
+    return get_write_queue(SEED_WORKSHEET, get_worksheet, on_error=lambda e: invalidate_worksheet())
+
+def pending_assignments():
+    """{player: seed} for claims journaled but not yet appended to the sheet"""
+    return {row[0]: row[1] for row in _seed_queue().pending()}
+
+def _read_assignments():
     sheet = get_worksheet()
+    records = sheets_io.call(sheet.title, "get_all_records", sheet.get_all_records)
+    assignments = {row["Player"]: row["Seed"] for row in records}
+    # Claims still waiting in the write queue count as assigned
+    for player, seed in pending_assignments().items():
+        assignments.setdefault(player, seed)
+    return assignments
+
+def invalidate_assignments():
+    """Force the next load_assignments() to re-read the sheet"""
+    with _assignments_lock:
+        _assignments["fetched_at"] = 0.0
+
+def load_assignments():
+    ttl = float(get_setting("seed_sheet", "assignments_ttl", 5))
+    with _assignments_lock:
+        data, fetched_at = _assignments["data"], _assignments["fetched_at"]
+    if data is not None and time.time() - fetched_at < ttl:
+        CACHE_REQUESTS.inc(cache="assignments", name="seed", result="hit")
+        return dict(data), None
+    # One session reconciles with the sheet; the rest keep using the cached copy meanwhile
+    if not _refresh_lock.acquire(blocking=data is None):
+        CACHE_REQUESTS.inc(cache="assignments", name="seed", result="stale")
+        return dict(data), None
     try:
-        records = sheet.get_all_records()
-        return {row["Player"]: row["Seed"] for row in records}, None
+        with _assignments_lock:
+            data, fetched_at = _assignments["data"], _assignments["fetched_at"]
+        if data is not None and time.time() - fetched_at < ttl:
+            CACHE_REQUESTS.inc(cache="assignments", name="seed", result="hit")
+            return dict(data), None
+        CACHE_REQUESTS.inc(cache="assignments", name="seed", result="miss")
+        data = _read_assignments()
+        with _assignments_lock:
+            _assignments.update(data=data, fetched_at=time.time())
+        return dict(data), None
     except KeyError as e:
         return None, f"❌ Google Sheet is missing column: {e}"
+    except SheetsUnavailableError:
+        # The handle may be stale (sheet deleted or recreated); reopen it next time
+        invalidate_worksheet()
+        return None, SHEETS_BUSY_MESSAGE
+    finally:
+        _refresh_lock.release()
 
 def append_assignment(player, seed, timestamp):
-    sheet = get_worksheet()
-    sheet.append_row([player, seed, timestamp])
+    """Queue the claim row for the sheet; returns once it is journaled, with its Ticket"""
+    with _assignments_lock:
+        data = _assignments["data"] or {}
+        conflict = player in data or seed in data.values()
+    if conflict:
+        # Someone got there first; reconcile with the sheet before showing the grid again
+        invalidate_assignments()
+        raise SeedConflictError(f"❌ {seed} was just taken by another player, please pick another.")
+    try:
+        ticket = _seed_queue().submit([player, seed, timestamp])
+    except Exception:
+        SEED_CLAIM_WRITES.inc(result="error")
+        raise
+    SEED_CLAIM_WRITES.inc(result="ok")
+    with _assignments_lock:
+        if _assignments["data"] is not None:
+            data = dict(_assignments["data"])
+            data[player] = seed
+            _assignments["data"] = data
+    return ticket
@@ -0,0 +1,304 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import gspread
+import requests
+from utils.config import get_setting
+
+# Pluggable Google Sheets backend.
+#
+#   live   - talk to Google Sheets directly (default)
+#   record - talk to Google Sheets and write every response to a cassette on disk
+#   replay - serve the recorded cassettes locally, no network or credentials needed
+#
+# Configure it through the [sheets_backend] section of secrets.toml, or call
+# configure_backend() from a benchmark / load-test script.
+
+DEFAULT_CASSETTE_DIR = "cassettes"
+
+_overrides = {}
+_file_lock = threading.Lock()
+_replay_state = {}
+_replay_lock = threading.Lock()
+_rng = random.Random()
+_auth_errors_raised = 0
+
+
+def configure_backend(**settings):
+    """Override the [sheets_backend] secrets (mode, path, latency_ms, ...)"""
+    global _auth_errors_raised
+    _overrides.update(settings)
+    _auth_errors_raised = 0
+    if "random_seed" in settings:
+        _rng.seed(settings["random_seed"])
+    with _replay_lock:
+        _replay_state.clear()
+
+
+def get_backend_settings():
+    settings = {
+        "mode": get_setting("sheets_backend", "mode", "live"),
+        "path": get_setting("sheets_backend", "path", DEFAULT_CASSETTE_DIR),
+        "latency_ms": float(get_setting("sheets_backend", "latency_ms", 0)),
+        "latency_jitter_ms": float(get_setting("sheets_backend", "latency_jitter_ms", 0)),
+        "quota_error_rate": float(get_setting("sheets_backend", "quota_error_rate", 0)),
+        "auth_error_appends": int(get_setting("sheets_backend", "auth_error_appends", 0)),
+    }
+    settings.update(_overrides)
+    return settings
+
+
+def open_client(authorize):
+    """Return a gspread-compatible client for the configured backend.
+
+    authorize is only called when the backend needs a real gspread client.
+    """
+    settings = get_backend_settings()
+    mode = settings["mode"]
+    if mode == "replay":
+        return ReplayClient(settings)
+    client = authorize()
+    if mode == "record":
+        return RecordingClient(client, settings["path"])
+    return client
+
+
+def spreadsheet_id_from_url(url):
+    match = re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", url)
+    return match.group(1) if match else _slug(url)
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", str(text)).strip("_") or "_"
+
+
+def _cassette_path(root, spreadsheet_id, worksheet):
+    return os.path.join(root, _slug(spreadsheet_id), f"{_slug(worksheet)}.json")
+
+
+def _read_cassette(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_cassette(path, cassette):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cassette, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _update_cassette(path, **fields):
+    with _file_lock:
+        cassette = _read_cassette(path)
+        cassette.update(fields)
+        _write_cassette(path, cassette)
+
+
+def _extend_cassette(path, key, items):
+    with _file_lock:
+        cassette = _read_cassette(path)
+        cassette[key] = cassette.get(key, []) + items
+        _write_cassette(path, cassette)
+
+
+def _records_from_values(values):
+    if not values:
+        return []
+    header = values[0]
+    return [dict(zip(header, row + [""] * (len(header) - len(row)))) for row in values[1:]]
+
+
+def quota_error(retry_after=1):
+    """Build the APIError gspread raises when the Sheets read/write quota is exhausted"""
+    response = requests.Response()
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    response._content = json.dumps({
+        "error": {
+            "code": 429,
+            "message": "Quota exceeded for quota metric 'Read requests' (replayed)",
+            "status": "RESOURCE_EXHAUSTED",
+        }
+    }).encode("utf-8")
+    return gspread.exceptions.APIError(response)
+
+
+# --- Recording ---
+
+class RecordingClient:
+    def __init__(self, client, root):
+        self._client = client
+        self._root = root
+
+    def open(self, title, *args, **kwargs):
+        return RecordingSpreadsheet(self._client.open(title, *args, **kwargs), self._root, f"title-{title}")
+
+    def open_by_url(self, url):
+        return RecordingSpreadsheet(self._client.open_by_url(url), self._root, spreadsheet_id_from_url(url))
+
+    def open_by_key(self, key):
+        return RecordingSpreadsheet(self._client.open_by_key(key), self._root, key)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class RecordingSpreadsheet:
+    def __init__(self, spreadsheet, root, spreadsheet_id):
+        self._spreadsheet = spreadsheet
+        self._root = root
+        self._id = spreadsheet_id
+
+    def worksheet(self, name):
+        path = _cassette_path(self._root, self._id, name)
+        try:
+            ws = self._spreadsheet.worksheet(name)
+        except gspread.exceptions.WorksheetNotFound:
+            _update_cassette(path, title=name, missing=True)
+            raise
+        _update_cassette(path, title=name, missing=False)
+        return RecordingWorksheet(ws, path)
+
+    def __getattr__(self, name):
+        return getattr(self._spreadsheet, name)
+
+
+class RecordingWorksheet:
+    def __init__(self, worksheet, path):
+        self._worksheet = worksheet
+        self._path = path
+
+    def get_all_values(self, *args, **kwargs):
+        values = self._worksheet.get_all_values(*args, **kwargs)
+        _update_cassette(self._path, get_all_values=values)
+        return values
+
+    def get_all_records(self, *args, **kwargs):
+        records = self._worksheet.get_all_records(*args, **kwargs)
+        _update_cassette(self._path, get_all_records=records)
+        return records
+
+    def append_row(self, values, *args, **kwargs):
+        result = self._worksheet.append_row(values, *args, **kwargs)
+        _extend_cassette(self._path, "appends", [list(values)])
+        return result
+
+    def append_rows(self, values, *args, **kwargs):
+        result = self._worksheet.append_rows(values, *args, **kwargs)
+        _extend_cassette(self._path, "appends", [list(row) for row in values])
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._worksheet, name)
+
+
+# --- Replay ---
+
+def _simulate_call(settings):
+    """Apply the configured latency and quota-error rate to a replayed call"""
+    delay_ms = settings["latency_ms"]
+    if settings["latency_jitter_ms"]:
+        delay_ms = _rng.gauss(delay_ms, settings["latency_jitter_ms"])
+    if delay_ms > 0:
+        time.sleep(delay_ms / 1000)
+    if settings["quota_error_rate"] and _rng.random() < settings["quota_error_rate"]:
+        raise quota_error()
+
+
+def _simulate_auth_outage(settings):
+    """Fail the first auth_error_appends appends like a token refresh that can't connect"""
+    global _auth_errors_raised
+    with _replay_lock:
+        if _auth_errors_raised >= settings["auth_error_appends"]:
+            return
+        _auth_errors_raised += 1
+    import google.auth.exceptions
+
+    raise google.auth.exceptions.TransportError(
+        requests.exceptions.ConnectionError("Connection reset by peer (replayed token refresh)"))
+
+
+class ReplayClient:
+    def __init__(self, settings):
+        self._settings = settings
+
+    def open(self, title, *args, **kwargs):
+        return ReplaySpreadsheet(self._settings, f"title-{title}")
+
+    def open_by_url(self, url):
+        return ReplaySpreadsheet(self._settings, spreadsheet_id_from_url(url))
+
+    def open_by_key(self, key):
+        return ReplaySpreadsheet(self._settings, key)
+
+
+class ReplaySpreadsheet:
+    def __init__(self, settings, spreadsheet_id):
+        self._settings = settings
+        self.id = spreadsheet_id
+
+    def worksheet(self, name):
+        _simulate_call(self._settings)
+        path = _cassette_path(self._settings["path"], self.id, name)
+        with _replay_lock:
+            state = _replay_state.get(path)
+            if state is None:
+                cassette = _read_cassette(path)
+                if not cassette or cassette.get("missing"):
+                    raise gspread.exceptions.WorksheetNotFound(name)
+                values = cassette.get("get_all_values")
+                records = cassette.get("get_all_records")
+                if values is None:
+                    values = []
+                    if records:
+                        values = [list(records[0].keys())] + [list(r.values()) for r in records]
+                if records is None:
+                    records = _records_from_values(values)
+                state = {"values": values, "records": records}
+                _replay_state[path] = state
+        return ReplayWorksheet(self._settings, name, state)
+
+
+class ReplayWorksheet:
+    def __init__(self, settings, title, state):
+        self._settings = settings
+        self.title = title
+        self._state = state
+
+    def get_all_values(self, *args, **kwargs):
+        _simulate_call(self._settings)
+        with _replay_lock:
+            return [list(row) for row in self._state["values"]]
+
+    def get_all_records(self, *args, **kwargs):
+        _simulate_call(self._settings)
+        with _replay_lock:
+            return [dict(record) for record in self._state["records"]]
+
+    def append_row(self, values, *args, **kwargs):
+        return self.append_rows([values], *args, **kwargs)
+
+    def append_rows(self, values, *args, **kwargs):
+        _simulate_call(self._settings)
+        _simulate_auth_outage(self._settings)
+        rows = [list(row) for row in values]
+        with _replay_lock:
+            if not self._state["values"]:
+                # Live get_all_records() keys rows by the sheet's header row; without one
+                # the first appended row would silently become the header
+                raise ValueError(
+                    f"Replay cassette for '{self.title}' has no header row; "
+                    "record the worksheet with its header before appending"
+                )
+            # Appends stay in memory so every replay starts from the same cassette
+            self._state["values"].extend(rows)
+            self._state["records"].extend(_records_from_values([self._state["values"][0]] + rows))
+        return {"updates": {"updatedRows": len(rows)}}
@@ -0,0 +1,140 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, stop_after_delay, wait_random_exponential
+
+from utils.config import get_setting
+from utils.metrics import SHEETS_RETRIES, sheets_call
+from utils.tracing import span
+
+# Every Google Sheets call goes through call(): it is timed, counted, and
+# retried with jittered exponential backoff when the error is transient
+# (429 quota, 5xx, network, including a token refresh that couldn't connect).
+# There is no fixed delay on the happy path. gspread, requests and google-auth
+# are only imported once a call has actually failed.
+
+RETRYABLE = {"quota", "server", "network"}
+# A 5xx or dropped connection on a write may still have been applied, so
+# non-idempotent calls (append_row) are only retried when they were rejected
+RETRYABLE_WRITE = {"quota"}
+
+
+class SheetsUnavailableError(Exception):
+    """Google Sheets kept failing after all retries, or failed with a non-retryable error"""
+
+    def __init__(self, message, kind):
+        super().__init__(message)
+        self.kind = kind
+
+
+def classify_error(error):
+    """Return one of "missing", "quota", "server", "network", "auth" or "fatal" """
+    import google.auth.exceptions
+    import gspread
+    import requests
+
+    if isinstance(error, (gspread.exceptions.WorksheetNotFound, gspread.exceptions.SpreadsheetNotFound)):
+        return "missing"
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return "quota"
+    if status is not None and 500 <= status < 600:
+        return "server"
+    if status is not None:
+        return "fatal"
+    # Raised by AuthorizedSession when a token refresh can't reach the auth server
+    if isinstance(error, (requests.RequestException, google.auth.exceptions.TransportError)):
+        return "network"
+    if isinstance(error, google.auth.exceptions.RefreshError):
+        return "network" if getattr(error, "retryable", False) else "auth"
+    return "fatal"
+
+
+def retry_after_seconds(error):
+    """Seconds requested by a Retry-After header, or None"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _settings():
+    return {
+        "max_attempts": int(get_setting("sheets_retry", "max_attempts", 6)),
+        "max_delay": float(get_setting("sheets_retry", "max_delay", 120)),
+        "initial_backoff": float(get_setting("sheets_retry", "initial_backoff", 1)),
+        "max_backoff": float(get_setting("sheets_retry", "max_backoff", 32)),
+    }
+
+
+def _make_wait(settings):
+    backoff = wait_random_exponential(multiplier=settings["initial_backoff"], max=settings["max_backoff"])
+
+    def wait(retry_state):
+        retry_after = retry_after_seconds(retry_state.outcome.exception())
+        if retry_after is not None:
+            # Honour the server's hint, with a little jitter so sessions don't retry in lockstep
+            return retry_after + random.uniform(0, settings["initial_backoff"])
+        return backoff(retry_state)
+    return wait
+
+
+def _backoff_sleep(seconds):
+    with span("sheets.backoff_sleep"):
+        time.sleep(seconds)
+
+
+def call(worksheet, method, func, *args, retry_on=RETRYABLE, **kwargs):
+    """Run one Sheets API call with metrics, tracing and quota-aware retries.
+
+    WorksheetNotFound / SpreadsheetNotFound are raised unchanged; any other
+    failure that survives the retries is raised as SheetsUnavailableError.
+    """
+    settings = _settings()
+
+    def attempt():
+        with span(f"sheets.{method}"), sheets_call(worksheet, method):
+            return func(*args, **kwargs)
+
+    def before_sleep(retry_state):
+        error = retry_state.outcome.exception()
+        kind = classify_error(error)
+        SHEETS_RETRIES.inc(worksheet=worksheet, reason=kind)
+        print(f"Sheets {method} on '{worksheet}' failed ({kind}: {error}), "
+              f"retrying in {retry_state.next_action.sleep:.1f}s")
+
+    retrying = Retrying(
+        retry=retry_if_exception(lambda e: classify_error(e) in retry_on),
+        wait=_make_wait(settings),
+        stop=stop_after_attempt(settings["max_attempts"]) | stop_after_delay(settings["max_delay"]),
+        before_sleep=before_sleep,
+        sleep=_backoff_sleep,
+        reraise=True,
+    )
+    try:
+        return retrying(attempt)
+    except Exception as e:
+        kind = classify_error(e)
+        if kind == "missing":
+            raise
+        raise SheetsUnavailableError(f"Sheets {method} on '{worksheet}' failed ({kind}): {e}", kind) from e
+
+
+def get_worksheet_or_none(sheet, name):
+    """Open a worksheet, returning None only if it doesn't exist"""
+    import gspread
+
+    try:
+        return call(name, "worksheet", sheet.worksheet, name)
+    except gspread.exceptions.WorksheetNotFound:
+        print(f"Worksheet '{name}' not found")
+        return None
@@ -0,0 +1,122 @@
+import functools
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Lightweight nested timing spans. Each script run (one thread) builds its own
+# span tree; finished spans also feed a process-wide rolling history so the
+# performance panel can show p50/p95 per phase across reruns.
+
+HISTORY_SIZE = 200
+
+_local = threading.local()
+_history = defaultdict(lambda: deque(maxlen=HISTORY_SIZE))
+_history_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("name", "wall_ms", "cpu_ms", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_ms = 0.0
+        self.cpu_ms = 0.0
+        self.children = []
+
+
+def _record(name, wall_ms):
+    with _history_lock:
+        _history[name].append(wall_ms)
+
+
+def start_trace(name="rerun"):
+    """Start a new span tree for the current script run"""
+    root = Span(name)
+    _local.stack = [root]
+    _local.started = (time.perf_counter(), time.thread_time())
+    return root
+
+
+def current_trace():
+    """Root span of the trace active in this thread, or None"""
+    stack = getattr(_local, "stack", None)
+    return stack[0] if stack else None
+
+
+def finish_trace():
+    """Close the current span tree and return its root (or None if no trace is active)"""
+    stack = getattr(_local, "stack", None)
+    if not stack:
+        return None
+    root = stack[0]
+    wall_start, cpu_start = _local.started
+    root.wall_ms = (time.perf_counter() - wall_start) * 1000
+    root.cpu_ms = (time.thread_time() - cpu_start) * 1000
+    _record(root.name, root.wall_ms)
+    _local.stack = None
+    return root
+
+
+@contextmanager
+def span(name):
+    """Time a phase; nests under the innermost open span of the current trace"""
+    s = Span(name)
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].children.append(s)
+        stack.append(s)
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield s
+    finally:
+        s.wall_ms = (time.perf_counter() - wall_start) * 1000
+        s.cpu_ms = (time.thread_time() - cpu_start) * 1000
+        if stack and stack[-1] is s:
+            stack.pop()
+        _record(name, s.wall_ms)
+
+
+def traced(name=None):
+    """Decorator form of span()"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _percentile(sorted_values, pct):
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def get_phase_percentiles():
+    """Rolling wall-time percentiles per phase: {name: {"count", "p50_ms", "p95_ms"}}"""
+    with _history_lock:
+        snapshot = {name: sorted(values) for name, values in _history.items() if values}
+    return {
+        name: {
+            "count": len(values),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+        }
+        for name, values in sorted(snapshot.items())
+    }
+
+
+def format_span_tree(root):
+    """Render a span tree as indented text lines"""
+    lines = []
+
+    def walk(s, depth):
+        lines.append(f"{'  ' * depth}{s.name:<{max(1, 28 - 2 * depth)}} {s.wall_ms:8.1f} ms  cpu {s.cpu_ms:7.1f} ms")
+        for child in s.children:
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return "\n".join(lines)
@@ -0,0 +1,92 @@
+import pandas as pd
+import streamlit as st
+
+from utils.data_utils import display_division_name
+from utils.metrics import mark_cache_miss
+from utils.tracing import traced
+
+# League-wide aggregates for the trends page. Everything is reduced here with
+# pandas/NumPy so the charts only receive a handful of points per season,
+# however many fixtures there are.
+
+
+@traced("trends.legs")
+def fixture_legs(fixtures):
+    """One row per played leg: Season, Division, HomeGoals, AwayGoals"""
+    df = pd.DataFrame(fixtures, columns=["season", "division", "home_leg1", "away_leg1", "home_leg2", "away_leg2"])
+    legs = pd.concat([
+        df[["season", "division", "home_leg1", "away_leg1"]].set_axis(["Season", "Division", "HomeGoals", "AwayGoals"], axis=1),
+        df[["season", "division", "home_leg2", "away_leg2"]].set_axis(["Season", "Division", "HomeGoals", "AwayGoals"], axis=1),
+    ], ignore_index=True).dropna(subset=["HomeGoals", "AwayGoals"])
+    legs["Division"] = legs["Division"].map(display_division_name)
+    legs[["HomeGoals", "AwayGoals"]] = legs[["HomeGoals", "AwayGoals"]].astype(int)
+    return legs
+
+
+@traced("trends.leg_stats")
+def leg_stats(legs):
+    """Goals per leg, home/away win rate and draw rate by season and division"""
+    diff = (legs["HomeGoals"] - legs["AwayGoals"]).to_numpy()
+    frame = legs.assign(
+        Goals=legs["HomeGoals"] + legs["AwayGoals"],
+        GoalDiff=diff,
+        HomeWin=(diff > 0).astype(float),
+        Draw=(diff == 0).astype(float),
+        AwayWin=(diff < 0).astype(float),
+    )
+    return frame.groupby(["Season", "Division"], as_index=False).agg(
+        Legs=("Goals", "size"),
+        GoalsPerLeg=("Goals", "mean"),
+        HomeGoalDiff=("GoalDiff", "mean"),
+        HomeWinRate=("HomeWin", "mean"),
+        DrawRate=("Draw", "mean"),
+        AwayWinRate=("AwayWin", "mean"),
+    )
+
+
+@traced("trends.participation")
+def participation(performance):
+    """Number of players per season and division"""
+    return performance.groupby(["Season", "Division"], as_index=False).agg(Players=("Player", "nunique"))
+
+
+@traced("trends.division_flows")
+def division_flows(performance, seasons):
+    """Player moves between consecutive seasons: From -> To counts, with New / Left for joiners and leavers"""
+    by_season = performance.drop_duplicates(["Player", "Season"]).pivot(index="Player", columns="Season", values="Division")
+    by_season = by_season.reindex(columns=seasons).fillna("Out")
+    flows = []
+    for previous, current in zip(seasons, seasons[1:]):
+        pair = pd.DataFrame({
+            "From": by_season[previous].to_numpy(),
+            "To": by_season[current].to_numpy(),
+        })
+        pair = pair[(pair["From"] != "Out") | (pair["To"] != "Out")]
+        pair["From"] = pair["From"].replace("Out", "New")
+        pair["To"] = pair["To"].replace("Out", "Left")
+        counts = pair.value_counts(["From", "To"]).rename("Players").reset_index()
+        counts.insert(0, "Season", current)
+        flows.append(counts)
+    if not flows:
+        return pd.DataFrame(columns=["Season", "From", "To", "Players"])
+    flows = pd.concat(flows, ignore_index=True)
+    flows["Move"] = flows["From"] + " → " + flows["To"]
+    return flows
+
+
+@st.cache_data(show_spinner=False)
+def league_trends(data_version, _dataset):
+    """All trend aggregates for one data version (the dataset itself is not hashed)"""
+    mark_cache_miss()
+    legs = fixture_legs(_dataset.fixtures)
+    performance = _dataset.seasonal_performance
+    stats = leg_stats(legs)
+    league = leg_stats(legs.assign(Division="All"))
+    return {
+        "leg_stats": stats,
+        "league": league,
+        "participation": participation(performance),
+        "flows": division_flows(performance, _dataset.seasons),
+        "legs": int(len(legs)),
+        "home_goal_share": float(legs["HomeGoals"].sum() / max(1, legs["HomeGoals"].sum() + legs["AwayGoals"].sum())),
+    }
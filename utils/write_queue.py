@@ -0,0 +1,275 @@
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: one server process per journal directory
+    fcntl = None
+
+from .config import get_setting
+from .metrics import SHEETS_DEAD_LETTERS, SHEETS_WRITE_BATCH
+from . import sheets_io
+from .sheets_io import SheetsUnavailableError
+
+# Write-behind queue for Sheets appends. A row is journaled (fsync'd JSONL)
+# before submit() returns, which is the durability the claimant is told
+# about; a background thread then appends everything pending in one
+# append_rows call every [write_queue] interval seconds. Failed batches stay
+# queued and are retried with backoff: quota, server, network, auth and
+# missing-worksheet errors hit the whole batch and go away once Sheets or the
+# connection recovers. Only a batch Sheets rejected (HTTP 400) has its rows
+# sent one at a time, and each row that is still rejected on its own is moved
+# to a dead-letter journal and its ticket fails. Rows still in the journal
+# when the process starts (it crashed or was stopped) are queued again, so
+# delivery is at-least-once: a crash right after a batch lands can append it
+# twice.
+# Each process holds an flock on its own journal file; unlocked journals left
+# by dead processes are picked up by the next process to start a queue.
+
+DEFAULT_JOURNAL_DIR = os.path.join("cache", "write_queue")
+DEAD_LETTER_DIR = "dead_letter"
+# The status Sheets answers with when it refuses the rows themselves
+REJECTED_STATUS = 400
+
+
+class Ticket:
+    """Handle for one queued row; written is set once it is in the sheet"""
+
+    def __init__(self, entry_id, row):
+        self.id = entry_id
+        self.row = row
+        self.written = threading.Event()
+        self.done = threading.Event()
+        self.error = None
+
+    def wait(self, timeout=None):
+        """Block until the row is in the sheet; returns False on timeout.
+
+        Raises SheetsUnavailableError if the row was moved to the dead-letter journal.
+        """
+        if not self.done.wait(timeout):
+            return False
+        if self.error is not None:
+            raise self.error
+        return True
+
+
+def _try_lock(path):
+    """Open path and take an exclusive flock on it; None if another process holds it"""
+    handle = open(path, "a", encoding="utf-8")
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def _error_kind(error):
+    if isinstance(error, SheetsUnavailableError):
+        return error.kind
+    return sheets_io.classify_error(error)
+
+
+def _rejected(error):
+    """True if Sheets answered and refused the request, rather than it failing to get through"""
+    cause = error.__cause__ if isinstance(error, SheetsUnavailableError) else error
+    return getattr(getattr(cause, "response", None), "status_code", None) == REJECTED_STATUS
+
+
+def _read_journal(path):
+    """Rows journaled in path but never marked done, as [(id, row)]"""
+    entries, done = {}, set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn last line from a crash mid-write; that row was never confirmed
+                continue
+            if "row" in record:
+                entries[record["id"]] = record["row"]
+            else:
+                done.update(record["done"])
+    return [(entry_id, row) for entry_id, row in entries.items() if entry_id not in done]
+
+
+class WriteQueue:
+    def __init__(self, name, get_worksheet, journal_dir, interval=0.3, max_batch=100,
+                 max_backoff=30, on_error=None):
+        self.name = name
+        self.get_worksheet = get_worksheet
+        self.journal_dir = journal_dir
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_backoff = max_backoff
+        self.on_error = on_error
+        self._pending = []
+        self._cond = threading.Condition()
+        self._journal_lock = threading.Lock()
+        self._thread = None
+        # Rows left to send one at a time after Sheets rejected their batch
+        self._isolate = 0
+        self._recover()
+
+    def _recover(self):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self._journal_handle = None
+        index = 0
+        while self._journal_handle is None:
+            suffix = f".{index}" if index else ""
+            self.journal_path = os.path.join(self.journal_dir, f"{self.name}{suffix}.jsonl")
+            self._journal_handle = _try_lock(self.journal_path)
+            index += 1
+        # Our own journal plus any other process's that is no longer locked (its owner died)
+        recovered = _read_journal(self.journal_path)
+        orphans = []
+        for path in sorted(glob.glob(os.path.join(self.journal_dir, f"{self.name}.*jsonl"))):
+            if os.path.abspath(path) == os.path.abspath(self.journal_path):
+                continue
+            handle = _try_lock(path)
+            if handle is None:
+                continue
+            rows = _read_journal(path)
+            orphans.append(handle)
+            if rows:
+                # Copy them into our journal before the orphan is emptied
+                self._append_journal([{"id": entry_id, "row": row} for entry_id, row in rows])
+                recovered += rows
+        for handle in orphans:
+            handle.truncate(0)
+            handle.close()
+        self._pending = [Ticket(entry_id, row) for entry_id, row in recovered]
+        if self._pending:
+            print(f"Write queue '{self.name}': re-queued {len(self._pending)} journaled rows")
+            self._start()
+        else:
+            self._truncate_journal()
+
+    def _append_journal(self, records):
+        with self._journal_lock:
+            f = self._journal_handle
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _dead_letter(self, ticket, error, kind):
+        """Move one row to the dead-letter journal and fail its ticket"""
+        path = os.path.join(self.journal_dir, DEAD_LETTER_DIR, f"{self.name}.jsonl")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {"id": ticket.id, "row": ticket.row, "kind": kind, "error": str(error), "failed_at": time.time()}
+        with self._journal_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"Write queue '{self.name}': row {ticket.row} moved to {path} ({kind}: {error})")
+        SHEETS_DEAD_LETTERS.inc(queue=self.name, reason=kind)
+        ticket.error = SheetsUnavailableError(
+            f"Sheets append to '{self.name}' failed ({kind}): {error}; the row was set aside in {path}", kind)
+
+    def _truncate_journal(self):
+        with self._journal_lock:
+            self._journal_handle.truncate(0)
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"write-queue-{self.name}", daemon=True)
+            self._thread.start()
+
+    def submit(self, row):
+        """Journal row and queue it for the next batch; returns a Ticket"""
+        ticket = Ticket(uuid.uuid4().hex, list(row))
+        with self._cond:
+            # Journal under the queue lock so journal order matches append order
+            self._append_journal([{"id": ticket.id, "row": ticket.row}])
+            self._pending.append(ticket)
+            self._start()
+            self._cond.notify()
+        return ticket
+
+    def pending(self):
+        with self._cond:
+            return [ticket.row for ticket in self._pending]
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Let a burst of claims pile up into one batch
+            time.sleep(self.interval)
+            with self._cond:
+                batch = self._pending[:1 if self._isolate else self.max_batch]
+            try:
+                worksheet = self.get_worksheet()
+                sheets_io.call(worksheet.title, "append_rows", worksheet.append_rows,
+                               [ticket.row for ticket in batch], retry_on=sheets_io.RETRYABLE_WRITE)
+            except Exception as e:
+                kind = _error_kind(e)
+                SHEETS_WRITE_BATCH.observe(len(batch), queue=self.name, result="error")
+                if self.on_error:
+                    self.on_error(e)
+                if _rejected(e):
+                    if len(batch) > 1:
+                        # Find out which rows are at fault by sending them one at a time
+                        print(f"Write queue '{self.name}': batch of {len(batch)} was rejected ({e}), "
+                              "retrying its rows one by one")
+                        self._isolate = len(batch)
+                        continue
+                    self._dead_letter(batch[0], e, kind)
+                    self._finish(batch)
+                    continue
+                failures += 1
+                delay = min(self.max_backoff, 2 ** failures)
+                print(f"Write queue '{self.name}': batch of {len(batch)} failed ({e}), retrying in {delay}s")
+                time.sleep(delay)
+                continue
+            failures = 0
+            SHEETS_WRITE_BATCH.observe(len(batch), queue=self.name, result="ok")
+            for ticket in batch:
+                ticket.written.set()
+            self._finish(batch)
+
+    def _finish(self, batch):
+        """Take a batch that was written or dead-lettered off the queue and the journal"""
+        self._isolate = max(0, self._isolate - len(batch))
+        self._append_journal([{"done": [ticket.id for ticket in batch]}])
+        with self._cond:
+            del self._pending[:len(batch)]
+            empty = not self._pending
+        for ticket in batch:
+            ticket.done.set()
+        if empty:
+            with self._cond:
+                # Nothing slipped in while we were busy; start a fresh journal
+                if not self._pending:
+                    self._truncate_journal()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_write_queue(name, get_worksheet, on_error=None):
+    """The process-wide write queue for one worksheet, configured from [write_queue]"""
+    with _queues_lock:
+        queue = _queues.get(name)
+        if queue is None:
+            queue = _queues[name] = WriteQueue(
+                name,
+                get_worksheet,
+                get_setting("write_queue", "journal_dir", DEFAULT_JOURNAL_DIR),
+                interval=float(get_setting("write_queue", "interval", 0.3)),
+                max_batch=int(get_setting("write_queue", "max_batch", 100)),
+                max_backoff=float(get_setting("write_queue", "max_backoff", 30)),
+                on_error=on_error,
+            )
+    return queue